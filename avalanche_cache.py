@@ -0,0 +1,79 @@
+#Trwała pamięć podręczna wyników symulacji lawinowej (SQLite).
+#Wynik run_simulation zależy tylko od (rundy, w, bajty wiadomości) i wersji silnika, więc po
+#pierwszym przeliczeniu scenariusze odtwarzane są z dysku. Najdawniej używane wpisy są
+#usuwane, gdy łączny rozmiar przekroczy limit.
+
+import os
+import json
+import time
+import sqlite3
+
+DOMYSLNA_SCIEZKA = os.path.join(os.path.expanduser("~"), ".cache", "keccak-wizualizacja", "lawina.sqlite")
+DOMYSLNY_LIMIT = 16 << 20   #bajtów danych wyników (krzywe + skróty)
+
+
+class AvalancheCache:
+    """
+    get(rounds, w, msg_bytes, wersja) -> (dist, bits, hexhash) albo None,
+    put(rounds, w, msg_bytes, wersja, dist, bits, hexhash).
+    Obiekt używa jednego połączenia - wołać tylko z wątku, który go utworzył (wątek Tk).
+    """
+    def __init__(self, sciezka=DOMYSLNA_SCIEZKA, max_bajtow=DOMYSLNY_LIMIT):
+        self.max_bajtow = max_bajtow
+        if sciezka != ":memory:":
+            os.makedirs(os.path.dirname(sciezka), exist_ok=True)
+        self.db = sqlite3.connect(sciezka)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS wyniki ("
+            " rounds INTEGER, w INTEGER, msg BLOB, wersja TEXT,"
+            " dist TEXT, bits INTEGER, hash TEXT, rozmiar INTEGER, uzycie REAL,"
+            " PRIMARY KEY (rounds, w, msg, wersja))"
+        )
+        self.db.commit()
+
+    def get(self, rounds, w, msg_bytes, wersja):
+        klucz = (rounds, w, bytes(msg_bytes), str(wersja))
+        wiersz = self.db.execute(
+            "SELECT dist, bits, hash FROM wyniki WHERE rounds = ? AND w = ? AND msg = ? AND wersja = ?", klucz
+        ).fetchone()
+        if wiersz is None:
+            return None
+        self.db.execute(
+            "UPDATE wyniki SET uzycie = ? WHERE rounds = ? AND w = ? AND msg = ? AND wersja = ?", (time.time(),) + klucz
+        )
+        self.db.commit()
+        dist, bits, hexhash = wiersz
+        return json.loads(dist), bits, hexhash
+
+    def put(self, rounds, w, msg_bytes, wersja, dist, bits, hexhash):
+        dist_json = json.dumps([int(d) for d in dist])
+        rozmiar = len(dist_json) + len(hexhash) + len(msg_bytes)
+        self.db.execute(
+            "INSERT OR REPLACE INTO wyniki VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rounds, w, bytes(msg_bytes), str(wersja), dist_json, bits, hexhash, rozmiar, time.time())
+        )
+        self.przytnij()
+        self.db.commit()
+
+    def rozmiar(self):
+        return self.db.execute("SELECT COALESCE(SUM(rozmiar), 0) FROM wyniki").fetchone()[0]
+
+    def przytnij(self):
+        #Usuwa najdawniej używane wpisy, aż łączny rozmiar zmieści się w limicie
+        nadmiar = self.rozmiar() - self.max_bajtow
+        if nadmiar <= 0:
+            return
+        usuwane = []
+        for rowid, rozmiar in self.db.execute("SELECT rowid, rozmiar FROM wyniki ORDER BY uzycie"):
+            usuwane.append((rowid,))
+            nadmiar -= rozmiar
+            if nadmiar <= 0:
+                break
+        self.db.executemany("DELETE FROM wyniki WHERE rowid = ?", usuwane)
+
+    def wyczysc(self):
+        self.db.execute("DELETE FROM wyniki")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
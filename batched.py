@@ -0,0 +1,237 @@
+#Wektorowy (NumPy) silnik Keccak-f: N niezależnych stanów jako tablica (N, 25) linii.
+#Każdy krok rundy to kilka operacji na całej tablicy - bez pętli Pythona po instancjach.
+#Linie trzymane są w najmniejszym typie bez znaku, który mieści w bitów (uint8 ... uint64).
+
+from functools import lru_cache
+import numpy as np
+from lanes import plan_permutacji, MAPA_PI
+
+
+def typ_linii(w):
+    for bity, typ in ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64)):
+        if w <= bity:
+            return typ
+    raise ValueError(f"Błąd: silnik wsadowy obsługuje w <= 64 (podano w = {w})")
+
+
+def nowe_stany(n, w):
+    return np.zeros((n, 25), dtype=typ_linii(w))
+
+
+class _Stale:
+    #Tablice zależne od w w typie linii (żeby przesunięcia nie promowały typu)
+    def __init__(self, w, rounds):
+        typ = typ_linii(w)
+        plan = plan_permutacji(w, rounds)
+        self.w = w
+        self.maska = typ(plan.maska)
+        self.jeden = typ(1 % w)
+        self.jeden_prawo = typ((w - 1 % w) % w)
+        self.rho_lewo = np.array(plan.przesuniecia_rho, dtype=typ)
+        self.rho_prawo = np.array([(w - x) % w for x in plan.przesuniecia_rho], dtype=typ)
+        self.stale_rund = [typ(RC) for RC in plan.stale_rund]
+        self.mapa_pi = np.array(MAPA_PI)
+
+
+@lru_cache(maxsize=32)
+def _stale(w, rounds):
+    return _Stale(w, rounds)
+
+
+def theta(A, s):
+    A5 = A.reshape(-1, 5, 5)                      #[n, y, x]
+    C = np.bitwise_xor.reduce(A5, axis=1)         #[n, x]
+    C1 = np.roll(C, -1, axis=1)                   #C[x + 1]
+    D = np.roll(C, 1, axis=1) ^ (((C1 << s.jeden) | (C1 >> s.jeden_prawo)) & s.maska)
+    return (A5 ^ D[:, None, :]).reshape(-1, 25)
+
+
+def rho(A, s):
+    return ((A << s.rho_lewo) | (A >> s.rho_prawo)) & s.maska
+
+
+def pi(A, s):
+    return A[:, s.mapa_pi]
+
+
+def chi(A, s):
+    A5 = A.reshape(-1, 5, 5)
+    return (A5 ^ (~np.roll(A5, -1, axis=2) & np.roll(A5, -2, axis=2))).reshape(-1, 25)
+
+
+def iota(A, RC):
+    A = A.copy()
+    A[:, 0] ^= RC
+    return A
+
+
+def permute_steps(A, w, rounds):
+    """Generator: po każdym z 5*rounds kroków zwraca (numer_rundy, nazwa_etapu, stany)."""
+    s = _stale(w, rounds)
+    for ir in range(rounds):
+        A = theta(A, s)
+        yield ir, "Theta", A
+        A = rho(A, s)
+        yield ir, "Rho", A
+        A = pi(A, s)
+        yield ir, "Pi", A
+        A = chi(A, s)
+        yield ir, "Chi", A
+        A = iota(A, s.stale_rund[ir])
+        yield ir, "Iota", A
+
+
+def permute(A, w, rounds, kroki=None):
+    """
+    Keccak-f na wszystkich stanach naraz. kroki - opcjonalnie zatrzymaj po tylu
+    pojedynczych krokach (Theta, Rho, ...), jak wizualizacja z callbackiem.
+    """
+    if kroki is None:
+        kroki = 5 * rounds
+    if kroki <= 0:
+        return A
+    for i, (_, _, A) in enumerate(permute_steps(A, w, rounds)):
+        if i + 1 >= kroki:
+            break
+    return A
+
+
+def bajty_na_linie(dane, w):
+    """(N, k) bajtów -> (N, 25) linii. Bajty to ciąg bitów stanu (little-endian), jak w KeccakSponge."""
+    dane = np.asarray(dane, dtype=np.uint8).reshape(len(dane), -1)
+    typ = typ_linii(w)
+    if np.dtype(typ).itemsize * 8 == w:
+        #Linia to dokładnie jeden element typu (w = 8/16/32/64) - wystarczy widok bajtów
+        bpl = w // 8
+        pelne = np.zeros((len(dane), 25 * bpl), dtype=np.uint8)
+        pelne[:, :dane.shape[1]] = dane[:, :25 * bpl]
+        return pelne.view(np.dtype(typ).newbyteorder('<')).astype(typ)
+    bity = np.zeros((len(dane), 25 * w), dtype=np.uint8)
+    rozpakowane = np.unpackbits(dane, axis=1, bitorder='little')[:, :25 * w]
+    bity[:, :rozpakowane.shape[1]] = rozpakowane
+    wagi = (np.ones(w, dtype=typ) << np.arange(w, dtype=typ))
+    return (bity.reshape(-1, 25, w).astype(typ) * wagi).sum(axis=2, dtype=typ)
+
+
+def linie_na_bajty(A, w, length):
+    """(N, 25) linii -> (N, length) bajtów (odpowiednik stan_na_bajty)."""
+    if np.dtype(typ_linii(w)).itemsize * 8 == w:
+        typ = np.dtype(typ_linii(w)).newbyteorder('<')
+        return np.ascontiguousarray(A.astype(typ)).view(np.uint8)[:, :length]
+    bity = ((A[:, :, None] >> np.arange(w, dtype=A.dtype)) & 1).astype(np.uint8).reshape(len(A), -1)
+    return np.packbits(bity, axis=1, bitorder='little')[:, :length]
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(A):
+        """Liczba ustawionych bitów w każdym elemencie (NumPy >= 2.0 ma to wbudowane)."""
+        return np.bitwise_count(A)
+else:
+    _BITY_BAJTU = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(A):
+        """Liczba ustawionych bitów w każdym elemencie - tablica dla bajtów, zsumowana po bajtach elementu."""
+        A = np.ascontiguousarray(A)
+        return _BITY_BAJTU[A.view(np.uint8).reshape(A.shape + (A.itemsize,))].sum(axis=-1, dtype=np.uint8)
+
+
+def xor_blocks(A, bloki, w):
+    return A ^ bajty_na_linie(bloki, w)
+
+
+def pad(dane, rate_in_bytes, sufiks=0x06):
+    """
+    Padding (jak padding_i_wchlanianie) dla wiadomości o tej samej długości:
+    (N, k) -> (N, m * rate_in_bytes), gotowe do absorb().
+    """
+    dane = np.asarray(dane, dtype=np.uint8).reshape(len(dane), -1)
+    dlugosc = dane.shape[1]
+    bloki = dlugosc // rate_in_bytes + 1
+    out = np.zeros((len(dane), bloki * rate_in_bytes), dtype=np.uint8)
+    out[:, :dlugosc] = dane
+    out[:, dlugosc] ^= sufiks
+    out[:, -1] ^= 0x80
+    return out
+
+
+def absorb(A, dane, w, rounds, rate_in_bytes):
+    """Wchłania pełne bloki z (N, m * rate_in_bytes) bajtów - XOR bloku i permutacja, blok po bloku."""
+    dane = np.asarray(dane, dtype=np.uint8).reshape(len(A), -1)
+    if dane.shape[1] % rate_in_bytes:
+        raise ValueError("Błąd: długość danych musi być wielokrotnością rate_in_bytes (użyj pad())")
+    for i in range(0, dane.shape[1], rate_in_bytes):
+        A = permute(xor_blocks(A, dane[:, i:i + rate_in_bytes], w), w, rounds)
+    return A
+
+
+def squeeze(A, w, rounds, rate_in_bytes, length):
+    """Wyciska length bajtów z każdego stanu -> (N, length), tak jak wyciskanie() po paddingu."""
+    out = []
+    zebrane = 0
+    while True:
+        blok = linie_na_bajty(A, w, rate_in_bytes)
+        out.append(blok)
+        zebrane += blok.shape[1]
+        if zebrane >= length:
+            break
+        A = permute(A, w, rounds)
+    return np.concatenate(out, axis=1)[:, :length]
+
+
+MAX_W_BITSLICE = 16     #do tej szerokości plastry bitowe są szybsze od linii
+
+
+def hash_many(messages, w, rounds, out_len, rate=None, sufiks=0x06, max_partia=1 << 16):
+    """
+    Skróty wielu niezależnych wiadomości naraz. Wiadomości grupowane są po liczbie bloków
+    (po paddingu), każda grupa idzie przez absorb/squeeze jako jedna partia; wynik w kolejności wejścia.
+    rate domyślnie jak w ataku kolizyjnym: 25*w - (512 jeśli 25*w > 512, inaczej 64).
+    Dla w <= 16 partie idą przez silnik bitslice (kilkanaście razy szybszy przy małych stanach).
+    Dla w > 64 (poza zasięgiem typów NumPy) liczy po kolei na KeccakLaneSponge.
+    """
+    bits = 25 * w
+    if rate is None:
+        rate = bits - (512 if bits > 512 else 64)
+    rate_in_bytes = rate // 8
+    messages = [bytes(m) for m in messages]
+
+    if w > 64:
+        from keccak import KeccakLaneSponge
+        wyniki = []
+        for m in messages:
+            k = KeccakLaneSponge(rate, bits - rate, w, rounds, sufiks=sufiks)
+            k.wchlanianie(m)
+            wyniki.append(k.wyciskanie(out_len))
+        return wyniki
+
+    if w <= MAX_W_BITSLICE:
+        import bitslice     #bitslice importuje ten moduł, więc dopiero tutaj
+
+    grupy = {}
+    for i, m in enumerate(messages):
+        grupy.setdefault(len(m) // rate_in_bytes + 1, []).append(i)
+
+    wyniki = [None] * len(messages)
+    for bloki, indeksy in grupy.items():
+        for start in range(0, len(indeksy), max_partia):
+            partia = indeksy[start:start + max_partia]
+            P = np.zeros((len(partia), bloki * rate_in_bytes), dtype=np.uint8)
+            dlugosci = np.fromiter((len(messages[i]) for i in partia), dtype=np.intp, count=len(partia))
+            #Wiersze o tej samej długości kopiowane jednym przypisaniem zamiast wiadomość po wiadomości
+            for L in np.unique(dlugosci):
+                wiersze = np.flatnonzero(dlugosci == L)
+                if L:
+                    dane = b''.join([messages[partia[j]] for j in wiersze])
+                    P[wiersze, :L] = np.frombuffer(dane, dtype=np.uint8).reshape(-1, L)
+            P[np.arange(len(partia)), dlugosci] ^= sufiks
+            P[:, -1] ^= 0x80
+            if w <= MAX_W_BITSLICE:
+                S = bitslice.absorb(bitslice.nowe_stany(len(partia), w), P, w, rounds, rate_in_bytes)
+                skroty = bitslice.squeeze(S, w, rounds, rate_in_bytes, out_len, len(partia))
+            else:
+                A = absorb(nowe_stany(len(partia), w), P, w, rounds, rate_in_bytes)
+                skroty = squeeze(A, w, rounds, rate_in_bytes, out_len)
+            dane = np.ascontiguousarray(skroty).tobytes()
+            for j, i in enumerate(partia):
+                wyniki[i] = dane[j * out_len:(j + 1) * out_len]
+    return wyniki
@@ -0,0 +1,96 @@
+#Silnik "bitsliced" dla małych szerokości linii (w = 1..16, działa do 64).
+#Bit z linii (x, y) z 64 niezależnych instancji siedzi w jednym słowie uint64, więc stan
+#ma kształt (25, w, K) i jedno przejście theta/rho/pi/chi/iota przesuwa naraz K*64 gąbek.
+#Każdy krok to kilka operacji NumPy na całej tablicy - koszt prawie nie zależy od liczby instancji.
+
+from functools import lru_cache
+import numpy as np
+import batched
+from lanes import plan_permutacji, MAPA_PI
+
+PELNE = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+class _Plan:
+    #Indeksy (linia, z) dla złożenia Rho + Pi oraz pozycje z, w których iota odwraca bit
+    def __init__(self, w, rounds):
+        plan = plan_permutacji(w, rounds)
+        self.zrodlo_linii = np.array([[MAPA_PI[i]] * w for i in range(25)])
+        self.zrodlo_z = np.array([[(z - plan.przesuniecia_rho[MAPA_PI[i]]) % w for z in range(w)] for i in range(25)])
+        self.bity_rc = [[z for z in range(w) if (RC >> z) & 1] for RC in plan.stale_rund]
+
+
+@lru_cache(maxsize=32)
+def _plan(w, rounds):
+    return _Plan(w, rounds)
+
+
+def liczba_slow(n):
+    return -(-n // 64)
+
+
+def nowe_stany(n, w):
+    return np.zeros((25, w, liczba_slow(n)), dtype=np.uint64)
+
+
+def permute(S, w, rounds):
+    p = _plan(w, rounds)
+    for ir in range(rounds):
+        #Theta
+        S5 = S.reshape(5, 5, w, -1)                          #[y, x, z, słowo]
+        C = np.bitwise_xor.reduce(S5, axis=0)                #[x, z, słowo]
+        D = np.roll(C, 1, axis=0) ^ np.roll(np.roll(C, -1, axis=0), 1, axis=1)
+        S = (S5 ^ D[None]).reshape(25, w, -1)
+        #Rho + Pi: samo przestawienie słów, bez żadnych operacji bitowych
+        S = S[p.zrodlo_linii, p.zrodlo_z]
+        #Chi
+        S5 = S.reshape(5, 5, w, -1)
+        S = (S5 ^ (~np.roll(S5, -1, axis=1) & np.roll(S5, -2, axis=1))).reshape(25, w, -1)
+        #Iota: XOR z bitem stałej to negacja całego słowa
+        S[0, p.bity_rc[ir]] ^= PELNE
+    return S
+
+
+def do_plastrow(A, w):
+    """(N, 25) linii (jak w batched) -> (25, w, K) słów uint64; brakujące instancje to zera."""
+    n = len(A)
+    typ = np.dtype(A.dtype).newbyteorder('<')
+    bajty = np.ascontiguousarray(A.astype(typ)).view(np.uint8).reshape(n, 25, typ.itemsize)
+    bity = np.unpackbits(bajty, axis=2, bitorder='little')[:, :, :w]               #[n, linia, z]
+    pelne = np.zeros((25, w, liczba_slow(n) * 64), dtype=np.uint8)
+    pelne[:, :, :n] = bity.transpose(1, 2, 0)
+    spakowane = np.packbits(pelne, axis=2, bitorder='little')
+    return np.ascontiguousarray(spakowane).view(np.dtype('<u8')).astype(np.uint64)
+
+
+def z_plastrow(S, w, n):
+    """(25, w, K) -> (n, 25) linii w typie batched.typ_linii(w)."""
+    typ = batched.typ_linii(w)
+    bajty = np.ascontiguousarray(S.astype(np.dtype('<u8'))).view(np.uint8)
+    bity = np.unpackbits(bajty, axis=2, bitorder='little')[:, :, :n]             #[linia, z, n]
+    wagi = np.ones(w, dtype=typ) << np.arange(w, dtype=typ)
+    return (bity.transpose(2, 0, 1).astype(typ) * wagi).sum(axis=2, dtype=typ)
+
+
+def absorb(S, dane, w, rounds, rate_in_bytes):
+    """Jak batched.absorb, ale na stanie w postaci plastrów. dane: (N, m * rate_in_bytes) po batched.pad()."""
+    dane = np.asarray(dane, dtype=np.uint8)
+    if dane.shape[1] % rate_in_bytes:
+        raise ValueError("Błąd: długość danych musi być wielokrotnością rate_in_bytes (użyj batched.pad())")
+    for i in range(0, dane.shape[1], rate_in_bytes):
+        S = permute(S ^ do_plastrow(batched.bajty_na_linie(dane[:, i:i + rate_in_bytes], w), w), w, rounds)
+    return S
+
+
+def squeeze(S, w, rounds, rate_in_bytes, length, n):
+    """Wyciska length bajtów z każdej z n instancji -> (n, length)."""
+    out = []
+    zebrane = 0
+    while True:
+        blok = batched.linie_na_bajty(z_plastrow(S, w, n), w, rate_in_bytes)
+        out.append(blok)
+        zebrane += blok.shape[1]
+        if zebrane >= length:
+            break
+        S = permute(S, w, rounds)
+    return np.concatenate(out, axis=1)[:, :length]
@@ -0,0 +1,850 @@
+#Silnik ataku urodzinowego (szukanie kolizji skróconego skrótu) bez zależności od Tk.
+#Każdy z N procesów losuje wejścia, liczy ich skróty wsadowo (batched.hash_many) i rozsyła
+#pary (skrót, wejście) do właścicieli fragmentów tablicy: fragment wybierany jest po prefiksie
+#skrótu, więc każdy skrót trafia zawsze do tego samego procesu i sprawdzanie kolizji nie
+#wymaga żadnej wspólnej blokady. Proces główny dostaje tylko zagregowany postęp.
+#Wejścia nie są przechowywane: wejście nr k to shake_128(ziarno || k), więc fragment tablicy
+#trzyma tylko obcięty skrót i licznik (TablicaSkrotow), a wejście odtwarza się na żądanie.
+#Długie ataki można co jakiś czas zapisywać do pliku kontrolnego i wznawiać (PunktKontrolny).
+#Uruchomiony bezpośrednio (python collision.py --help) działa bez GUI i zapisuje wynik w JSON.
+#Tryb rho (rho_attack) nie pamięta prób: iteruje skrót -> następne wejście i szuka cyklu
+#(Brent dla jednego procesu) albo zbiera tylko punkty wyróżnione ścieżek (van Oorschot-Wiener).
+
+import os
+import math
+import time
+import queue
+import signal
+import struct
+import hashlib
+import traceback
+import multiprocessing
+import numpy as np
+from keccak import KeccakLaneSponge
+
+
+def calculate_prob(attempts, hash_bytes):
+    """Przybliżenie urodzinowe: szansa (w %) na co najmniej jedną kolizję po attempts próbach."""
+    N = 2**(hash_bytes * 8)
+    if attempts > N: return 100.0
+    return (1 - math.exp(-(attempts**2) / (2 * N))) * 100
+
+
+def rate_ataku(w):
+    #Ta sama pojemność co w module ataku i w batched.hash_many
+    total_bits = 25 * w
+    return total_bits - (512 if total_bits > 512 else 64)
+
+
+def generuj_wejscie(ziarno, licznik, in_size):
+    #Deterministyczny generator wejść: to samo (ziarno, licznik) daje zawsze to samo wejście
+    return hashlib.shake_128(ziarno + int(licznik).to_bytes(8, 'little')).digest(in_size)
+
+
+def typ_klucza(out_size):
+    #Najmniejszy typ mieszczący skrót; dłuższe skróty są obcinane do 8 bajtów
+    for bajty, typ in ((2, np.uint16), (4, np.uint32)):
+        if out_size <= bajty:
+            return typ
+    return np.uint64
+
+
+def klucze_skrotow(skroty, out_size):
+    """Lista skrótów -> tablica kluczy (pierwsze do 8 bajtów skrótu, little-endian)."""
+    bajty = np.frombuffer(b''.join(skroty), dtype=np.uint8).reshape(len(skroty), out_size)
+    typ = np.dtype(typ_klucza(out_size))
+    pelne = np.zeros((len(skroty), typ.itemsize), dtype=np.uint8)
+    pelne[:, :min(out_size, typ.itemsize)] = bajty[:, :typ.itemsize]
+    return pelne.view(typ.newbyteorder('<')).reshape(-1).astype(typ)
+
+
+def fragmenty_skrotow(klucze, n):
+    #Numer procesu-właściciela każdego skrótu (po 2-bajtowym prefiksie)
+    return (klucze.astype(np.uint64) & np.uint64(0xFFFF)) % np.uint64(n)
+
+
+_FIBONACCI = np.uint64(0x9E3779B97F4A7C15)
+
+
+class TablicaSkrotow:
+    """
+    Tablica z otwartym adresowaniem (sondowanie liniowe) w dwóch tablicach NumPy:
+    obcięty skrót (uint16/32/64 zależnie od długości skrótu) i licznik wejścia - uint32,
+    dopóki liczniki mieszczą się w 32 bitach (ponad 4 mld prób), potem uint64.
+    Największa wartość typu licznika oznacza wolne miejsce.
+    dodaj() wstawia całą partię naraz i zwraca pary (licznik zapisany, licznik nowy)
+    dla kluczy, które już były - kandydatów na kolizję. Pierwszy zapisany licznik zostaje.
+    """
+    def __init__(self, out_size, pojemnosc=1 << 16, max_zapelnienie=0.85):
+        self.typ = typ_klucza(out_size)
+        self.typ_licznika = np.uint32
+        self.max_zapelnienie = max_zapelnienie
+        self.rozmiar = 0
+        self._przydziel(max(4, (pojemnosc - 1).bit_length()))
+
+    @property
+    def pusty(self):
+        return np.iinfo(self.typ_licznika).max
+
+    def _przydziel(self, bity):
+        self.bity = bity
+        self.klucze = np.zeros(1 << bity, dtype=self.typ)
+        self.liczniki = np.full(1 << bity, self.pusty, dtype=self.typ_licznika)
+
+    def zajete(self):
+        return self.liczniki != self.pusty
+
+    def wpisy(self):
+        """Zajęte miejsca jako (klucze, liczniki uint64) - np. do punktu kontrolnego."""
+        zajete = self.zajete()
+        return self.klucze[zajete], self.liczniki[zajete].astype(np.uint64)
+
+    @property
+    def pojemnosc(self):
+        return len(self.klucze)
+
+    @property
+    def nbytes(self):
+        return self.klucze.nbytes + self.liczniki.nbytes
+
+    def _sloty(self, klucze):
+        #Haszowanie Fibonacciego - klucze w jednym fragmencie mają takie same młodsze bity
+        return ((klucze.astype(np.uint64) * _FIBONACCI) >> np.uint64(64 - self.bity)).astype(np.intp)
+
+    def _powieksz(self, bity, typ_licznika=None):
+        klucze, liczniki = self.wpisy()
+        self.typ_licznika = typ_licznika or self.typ_licznika
+        self._przydziel(bity)
+        self.rozmiar = 0
+        self.dodaj(klucze, liczniki)
+
+    def dodaj(self, klucze, liczniki):
+        liczniki = np.asarray(liczniki, dtype=np.uint64)
+        if self.typ_licznika == np.uint32 and len(liczniki) and liczniki.max() >= self.pusty:
+            self._powieksz(self.bity, np.uint64)
+        while self.rozmiar + len(klucze) > self.max_zapelnienie * self.pojemnosc:
+            self._powieksz(self.bity + 1)
+        klucze = np.asarray(klucze, dtype=self.typ)
+        liczniki = liczniki.astype(self.typ_licznika)
+        maska = self.pojemnosc - 1
+        sloty = self._sloty(klucze)
+        czekajace = np.arange(len(klucze))
+        trafienia = []
+        while len(czekajace):
+            s = sloty[czekajace]
+            zajete = self.liczniki[s] != self.pusty
+            ten_sam = zajete & (self.klucze[s] == klucze[czekajace])
+            for i, slot in zip(czekajace[ten_sam], s[ten_sam]):
+                trafienia.append((int(self.liczniki[slot]), int(liczniki[i])))
+            #Wolne miejsca: przy kilku chętnych na ten sam slot wpisuje się pierwszy,
+            #pozostali w następnym obiegu zobaczą go jako zajęty (i ewentualnie ten sam klucz)
+            wolne = np.flatnonzero(~zajete)
+            _, pierwsze = np.unique(s[wolne], return_index=True)
+            wpisane = wolne[pierwsze]
+            self.klucze[s[wpisane]] = klucze[czekajace[wpisane]]
+            self.liczniki[s[wpisane]] = liczniki[czekajace[wpisane]]
+            self.rozmiar += len(wpisane)
+            #Zajęte innym kluczem: następne miejsce
+            dalej = zajete & ~ten_sam
+            sloty[czekajace[dalej]] = (s[dalej] + 1) & maska
+            zostaja = ~ten_sam
+            zostaja[wpisane] = False
+            czekajace = czekajace[zostaja]
+        return trafienia
+
+
+class WynikAtaku:
+    """
+    powod: "kolizja", "przerwano", "limit" albo "czas"; przy kolizji m1, m2 i digest są ustawione.
+    proby - łączna liczba policzonych skrótów, czas - sekundy od startu.
+    """
+    def __init__(self, powod, proby, czas, m1=None, m2=None, digest=None):
+        self.powod = powod
+        self.proby = proby
+        self.czas = czas
+        self.m1 = m1
+        self.m2 = m2
+        self.digest = digest
+
+    @property
+    def kolizja(self):
+        return self.powod == "kolizja"
+
+    @property
+    def na_sekunde(self):
+        return self.proby / self.czas if self.czas > 0 else 0.0
+
+
+MAGIA = b"KCKP"
+WERSJA_PLIKU = 1
+TRYB_URODZINOWY = 1
+TRYB_WYROZNIONE = 2
+#magia, wersja, tryb, w, rundy, wejście, wyjście, bity wyróżnione, ziarno, próby, baza licznika, liczba wpisów
+_NAGLOWEK = struct.Struct("<4sBBHHHHB16sQQQ")
+
+
+class PunktKontrolny:
+    """
+    Stan przerwanego ataku. Tryb urodzinowy: ziarno generatora, baza_licznika (od niej
+    zaczynają się nowe wejścia) i tablica skrótów jako dwie tablice klucze/liczniki.
+    Tryb punktów wyróżnionych: słownik punkty {punkt: (początek ścieżki, długość)}.
+    """
+    def __init__(self, tryb, cfg, proby=0, ziarno=bytes(16), baza_licznika=0, bity=0,
+                 klucze=None, liczniki=None, punkty=None):
+        self.tryb = tryb
+        self.cfg = cfg
+        self.proby = proby
+        self.ziarno = ziarno
+        self.baza_licznika = baza_licznika
+        self.bity = bity
+        self.klucze = klucze if klucze is not None else np.zeros(0, dtype=typ_klucza(cfg['out_size']))
+        self.liczniki = liczniki if liczniki is not None else np.zeros(0, dtype=np.uint64)
+        self.punkty = punkty if punkty is not None else {}
+
+    def pasuje(self, cfg):
+        return all(self.cfg[k] == cfg[k] for k in ("w", "rounds", "in_size", "out_size"))
+
+
+def zapisz_punkt_kontrolny(sciezka, pk):
+    """Zapis do pliku tymczasowego i os.replace - plik kontrolny jest zawsze cały (stary albo nowy)."""
+    out_size = pk.cfg['out_size']
+    if pk.tryb == TRYB_URODZINOWY:
+        liczba = len(pk.klucze)
+        dane = [np.asarray(pk.klucze, dtype=np.dtype(typ_klucza(out_size)).newbyteorder('<')).tobytes(),
+                np.asarray(pk.liczniki, dtype='<u8').tobytes()]
+    else:
+        liczba = len(pk.punkty)
+        dane = [b''.join(pk.punkty), b''.join(start for start, _ in pk.punkty.values()),
+                np.array([d for _, d in pk.punkty.values()], dtype='<u8').tobytes()]
+    naglowek = _NAGLOWEK.pack(MAGIA, WERSJA_PLIKU, pk.tryb, pk.cfg['w'], pk.cfg['rounds'], pk.cfg['in_size'],
+                              out_size, pk.bity, pk.ziarno, pk.proby, pk.baza_licznika, liczba)
+    katalog = os.path.dirname(os.path.abspath(sciezka))
+    os.makedirs(katalog, exist_ok=True)
+    tymczasowy = sciezka + ".tmp"
+    with open(tymczasowy, 'wb') as f:
+        f.write(naglowek)
+        for czesc in dane:
+            f.write(czesc)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tymczasowy, sciezka)
+
+
+def wczytaj_punkt_kontrolny(sciezka):
+    with open(sciezka, 'rb') as f:
+        dane = f.read()
+    if len(dane) < _NAGLOWEK.size or dane[:4] != MAGIA:
+        raise ValueError("Błąd: to nie jest plik kontrolny ataku")
+    (_, wersja, tryb, w, rounds, in_size, out_size, bity,
+     ziarno, proby, baza, liczba) = _NAGLOWEK.unpack_from(dane)
+    if wersja != WERSJA_PLIKU or tryb not in (TRYB_URODZINOWY, TRYB_WYROZNIONE):
+        raise ValueError(f"Błąd: nieobsługiwana wersja pliku kontrolnego ({wersja}, tryb {tryb})")
+    cfg = {"w": w, "rounds": rounds, "in_size": in_size, "out_size": out_size}
+    poz = _NAGLOWEK.size
+    if tryb == TRYB_URODZINOWY:
+        typ = np.dtype(typ_klucza(out_size)).newbyteorder('<')
+        oczekiwane = poz + liczba * (typ.itemsize + 8)
+    else:
+        oczekiwane = poz + liczba * (2 * out_size + 8)
+    if len(dane) != oczekiwane:
+        raise ValueError("Błąd: plik kontrolny jest uszkodzony (zła długość)")
+
+    if tryb == TRYB_URODZINOWY:
+        klucze = np.frombuffer(dane, dtype=typ, count=liczba, offset=poz).astype(typ_klucza(out_size))
+        liczniki = np.frombuffer(dane, dtype='<u8', count=liczba, offset=poz + liczba * typ.itemsize).astype(np.uint64)
+        return PunktKontrolny(tryb, cfg, proby, ziarno, baza, bity, klucze=klucze, liczniki=liczniki)
+    koniec_punktow = poz + liczba * out_size
+    koniec_startow = koniec_punktow + liczba * out_size
+    dlugosci = np.frombuffer(dane, dtype='<u8', count=liczba, offset=koniec_startow)
+    punkty = {
+        dane[poz + i * out_size:poz + (i + 1) * out_size]:
+            (dane[koniec_punktow + i * out_size:koniec_punktow + (i + 1) * out_size], int(dlugosci[i]))
+        for i in range(liczba)
+    }
+    return PunktKontrolny(tryb, cfg, proby, ziarno, baza, bity, punkty=punkty)
+
+
+class _Iteracja:
+    """
+    Odwzorowanie przestrzeni skrótów w siebie dla trybu rho: f(x) = skrót(x dopełnione zerami
+    do in_size bajtów). Kolizja f(a) = f(b) dla a != b to kolizja skrótu dla wejść wejscie(a), wejscie(b).
+    """
+    def __init__(self, cfg):
+        if cfg['in_size'] < cfg['out_size']:
+            raise ValueError("Błąd: w trybie rho wejście musi mieć co najmniej tyle bajtów co wyjście")
+        self.cfg = cfg
+        self.rate = rate_ataku(cfg['w'])
+        self.prototyp = KeccakLaneSponge(self.rate, 25 * cfg['w'] - self.rate, cfg['w'], cfg['rounds'])
+
+    def wejscie(self, x):
+        return bytes(x).ljust(self.cfg['in_size'], b'\0')
+
+    def __call__(self, x):
+        gabka = self.prototyp.copy()
+        gabka.wchlanianie(self.wejscie(x))
+        return bytes(gabka.wyciskanie(self.cfg['out_size']))
+
+    def wiele(self, punkty):
+        #Jeden krok dla wielu ścieżek naraz - silnikiem wsadowym
+        from batched import hash_many
+        return hash_many([self.wejscie(x) for x in punkty], self.cfg['w'], self.cfg['rounds'],
+                         self.cfg['out_size'], rate=self.rate)
+
+
+class _Przerwij(Exception):
+    pass
+
+
+def _proces_urodzinowy(nr, n, cfg, wyniki, stop, partia, interwal, ziarno, baza, poczatkowe, zadanie, skrzynki):
+    #zadanie - wspólny licznik próśb o zapis stanu (None - bez punktów kontrolnych)
+    from batched import hash_many
+
+    fragment = TablicaSkrotow(cfg['out_size'])     #tylko skróty należące do tego procesu
+    klucze, liczniki = poczatkowe
+    if len(klucze):
+        wlasne = fragmenty_skrotow(klucze, n) == nr
+        fragment.dodaj(klucze[wlasne], liczniki[wlasne])
+    policzone = 0
+    numer_partii = 0
+    znaczniki = 0       #ile procesów przysłało już znacznik końca (None) - po nim nie wyślą nic więcej
+    odpowiedziane = zadanie.value if zadanie is not None else 0
+    ostatni_raport = time.monotonic()
+    rate = rate_ataku(cfg['w'])
+
+    def skroty(liczniki):
+        wejscia = [generuj_wejscie(ziarno, c, cfg['in_size']) for c in liczniki]
+        return wejscia, hash_many(wejscia, cfg['w'], cfg['rounds'], cfg['out_size'], rate=rate)
+
+    def sprawdz(klucze, liczniki):
+        for stary, nowy in fragment.dodaj(klucze, liczniki):
+            #Klucz to obcięty skrót - potwierdzamy na pełnych skrótach odtworzonych wejść
+            (m1, m2), (d1, d2) = skroty([stary, nowy])
+            if m1 != m2 and d1 == d2:
+                wyniki.put(("kolizja", nr, policzone, m1, m2, d1))
+                return True
+        return False
+
+    def wyslij_stan(koniec):
+        wyniki.put(("stan", nr, policzone, koniec, numer_partii) + fragment.wpisy())
+
+    while not stop.is_set():
+        if zadanie is not None and zadanie.value != odpowiedziane:
+            odpowiedziane = zadanie.value
+            wyslij_stan(False)
+        #Partie procesów przeplatają się, więc liczniki (a więc i wejścia) się nie powtarzają
+        start = baza + (numer_partii * n + nr) * partia
+        numer_partii += 1
+        liczniki = np.arange(start, start + partia, dtype=np.uint64)
+        klucze = klucze_skrotow(skroty(liczniki)[1], cfg['out_size'])
+        policzone += partia
+
+        wlasciciele = fragmenty_skrotow(klucze, n)
+        for j in range(n):
+            if j != nr:
+                wybrane = wlasciciele == j
+                if wybrane.any():
+                    skrzynki[j].put((klucze[wybrane], liczniki[wybrane]))
+        wlasne = wlasciciele == nr
+        if sprawdz(klucze[wlasne], liczniki[wlasne]):
+            break
+        #Pary przysłane przez inne procesy
+        znaleziono = False
+        while not znaleziono:
+            try:
+                para = skrzynki[nr].get_nowait()
+            except queue.Empty:
+                break
+            if para is None:
+                znaczniki += 1
+                continue
+            znaleziono = sprawdz(*para)
+        if znaleziono:
+            break
+
+        if time.monotonic() - ostatni_raport >= interwal:
+            ostatni_raport = time.monotonic()
+            wyniki.put(("postep", nr, policzone))
+    wyniki.put(("postep", nr, policzone))
+    if zadanie is not None:
+        #Pary w drodze między procesami nie są w żadnym fragmencie. Znacznik końca idzie za ostatnią
+        #wysłaną parą (kolejka zachowuje kolejność od jednego nadawcy), więc po odebraniu znaczników
+        #od wszystkich końcowy stan zawiera każdą policzoną parę.
+        for j in range(n):
+            if j != nr:
+                skrzynki[j].put(None)
+        koniec_czekania = time.monotonic() + 5.0
+        while znaczniki < n - 1 and time.monotonic() < koniec_czekania:
+            try:
+                para = skrzynki[nr].get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if para is None:
+                znaczniki += 1
+            else:
+                fragment.dodaj(*para)   #po zatrzymaniu ewentualne trafienia już nie są zgłaszane
+        wyslij_stan(True)
+    for skrzynka in skrzynki:
+        skrzynka.cancel_join_thread()   #niewysłane pary nie są już potrzebne - nie czekamy na nie przy wyjściu
+
+
+def _proces_brent(nr, n, cfg, wyniki, stop, partia, interwal):
+    #Jedna ścieżka x0, f(x0), ...: Brent znajduje długość cyklu lam, potem wejście w cykl,
+    #gdzie dwa różne punkty mają ten sam obraz. Pamięć stała, niezależna od liczby prób.
+    f = _Iteracja(cfg)
+    policzone = 0
+    ostatni_raport = time.monotonic()
+
+    def krok(x):
+        nonlocal policzone, ostatni_raport
+        policzone += 1
+        if policzone % 1024 == 0:
+            if stop.is_set():
+                raise _Przerwij()
+            if time.monotonic() - ostatni_raport >= interwal:
+                ostatni_raport = time.monotonic()
+                wyniki.put(("postep", nr, policzone))
+        return f(x)
+
+    try:
+        while True:
+            x0 = os.urandom(cfg['out_size'])
+            potega = lam = 1
+            zolw, zajac = x0, krok(x0)
+            while zolw != zajac:
+                if potega == lam:
+                    zolw = zajac
+                    potega *= 2
+                    lam = 0
+                zajac = krok(zajac)
+                lam += 1
+
+            zolw = zajac = x0
+            for _ in range(lam):
+                zajac = krok(zajac)
+            if zolw == zajac:
+                continue    #x0 leży na cyklu - brak "ogonka", nie ma kolizji; nowy punkt startowy
+            while True:
+                nz, nj = krok(zolw), krok(zajac)
+                if nz == nj:
+                    wyniki.put(("kolizja", nr, policzone, f.wejscie(zolw), f.wejscie(zajac), nz))
+                    return
+                zolw, zajac = nz, nj
+    except _Przerwij:
+        wyniki.put(("postep", nr, policzone))
+
+
+def _proces_wyroznione(nr, n, cfg, wyniki, stop, partia, interwal, bity):
+    #partia ścieżek naraz; ścieżka kończy się w punkcie wyróżnionym (bity najmłodszych bitów = 0),
+    #który idzie do procesu głównego razem z początkiem i długością ścieżki
+    f = _Iteracja(cfg)
+    maska = (1 << bity) - 1
+    max_dlugosc = 20 << bity     #dłuższa ścieżka prawie na pewno kręci się w cyklu bez punktu wyróżnionego
+    starty = [os.urandom(cfg['out_size']) for _ in range(partia)]
+    punkty = list(starty)
+    dlugosci = [0] * partia
+    policzone = 0
+    ostatni_raport = time.monotonic()
+
+    while not stop.is_set():
+        skroty = f.wiele(punkty)
+        policzone += partia
+        wyroznione = []
+        for i, digest in enumerate(skroty):
+            dlugosci[i] += 1
+            if int.from_bytes(digest, 'little') & maska == 0:
+                wyroznione.append((digest, starty[i], dlugosci[i]))
+            elif dlugosci[i] < max_dlugosc:
+                punkty[i] = digest
+                continue
+            starty[i] = punkty[i] = os.urandom(cfg['out_size'])
+            dlugosci[i] = 0
+        if wyroznione:
+            wyniki.put(("punkty", nr, policzone, wyroznione))
+        if time.monotonic() - ostatni_raport >= interwal:
+            ostatni_raport = time.monotonic()
+            wyniki.put(("postep", nr, policzone))
+    wyniki.put(("postep", nr, policzone))
+
+
+def _zlokalizuj(f, start1, dlugosc1, start2, dlugosc2):
+    """
+    Dwie ścieżki kończące się tym samym punktem wyróżnionym: wyrównanie długości i wspólne
+    kroki aż do punktu złączenia. Zwraca (a, b, f(a)) albo None, gdy start jednej ścieżki leży
+    na drugiej (wtedy nie ma dwóch różnych poprzedników).
+    """
+    if dlugosc1 < dlugosc2:
+        start1, dlugosc1, start2, dlugosc2 = start2, dlugosc2, start1, dlugosc1
+    for _ in range(dlugosc1 - dlugosc2):
+        start1 = f(start1)
+    if start1 == start2:
+        return None
+    while True:
+        n1, n2 = f(start1), f(start2)
+        if n1 == n2:
+            return start1, start2, n1
+        start1, start2 = n1, n2
+
+
+class _ZapisUrodzinowy:
+    #Punkt kontrolny trybu urodzinowego: tablica jest rozproszona po procesach, więc zapis
+    #to prośba (zadanie += 1) i złożenie odpowiedzi "stan" od wszystkich procesów.
+    #Końcowy zapis (po zatrzymaniu) jest pełny. Zapis okresowy nie zawiera par, które były akurat
+    #w drodze między procesami (co najwyżej kilka partii) - po wznowieniu z niego te próby przepadają.
+    def __init__(self, sciezka, co_ile, n, cfg, ziarno, baza, baza_prob, partia, zadanie):
+        self.sciezka = sciezka
+        self.co_ile = co_ile
+        self.n = n
+        self.cfg = cfg
+        self.ziarno = ziarno
+        self.baza = baza
+        self.baza_prob = baza_prob
+        self.partia = partia
+        self.zadanie = zadanie
+        self.stany = {}
+        self.ostatni = time.monotonic()
+
+    def czy_czas(self):
+        return time.monotonic() - self.ostatni >= self.co_ile
+
+    def popros(self, proby):
+        self.ostatni = time.monotonic()
+        self.stany = {}
+        with self.zadanie.get_lock():
+            self.zadanie.value += 1
+
+    def przyjmij(self, komunikat, proby):
+        _, nr, policzone, koniec, numer_partii, klucze, liczniki = komunikat
+        if self.stany.get(nr, (False,))[0]:
+            return      #końcowy stan procesu już jest - spóźnione odpowiedzi na prośby są starsze
+        self.stany[nr] = (koniec, numer_partii, klucze, liczniki, policzone)
+        if len(self.stany) == self.n and not any(s[0] for s in self.stany.values()):
+            self.zapisz()
+            self.stany = {}
+
+    def zapisz(self):
+        stany = list(self.stany.values())
+        #Próby liczone z tych samych stanów co tablica (komunikaty "postep" mogą być starsze)
+        proby = self.baza_prob + sum(s[4] for s in stany)
+        #Nowa baza jest powyżej liczników przydzielonych przez procesy do chwili ich odpowiedzi.
+        #W zapisie okresowym tablice mogą mieć też liczniki wyższe (pary przesłane po odpowiedzi
+        #nadawcy); po wznowieniu takie wejście wróci jeszcze raz, a sprawdz odrzuci je (m1 == m2).
+        nowa_baza = self.baza + max(s[1] for s in stany) * self.n * self.partia
+        pk = PunktKontrolny(TRYB_URODZINOWY, self.cfg, proby, self.ziarno, nowa_baza,
+                            klucze=np.concatenate([s[2] for s in stany]),
+                            liczniki=np.concatenate([s[3] for s in stany]))
+        zapisz_punkt_kontrolny(self.sciezka, pk)
+        return proby
+
+    def zakoncz(self, wyniki, proby, timeout=10.0):
+        #Po ustawieniu stop każdy proces wysyła końcowy stan; czekamy na wszystkie.
+        #Zwraca liczbę prób zapisaną w pliku (None, gdy nie wszystkie stany dotarły)
+        koniec = time.monotonic() + timeout
+        while sum(1 for s in self.stany.values() if s[0]) < self.n and time.monotonic() < koniec:
+            try:
+                komunikat = wyniki.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if komunikat[0] == "stan":
+                self.przyjmij(komunikat, proby)
+        if len(self.stany) == self.n:
+            return self.zapisz()
+        return None
+
+
+class _ZapisWyroznionych:
+    #Punkty wyróżnione są w procesie głównym - zapis nie wymaga udziału procesów
+    def __init__(self, sciezka, co_ile, cfg, bity, punkty):
+        self.sciezka = sciezka
+        self.co_ile = co_ile
+        self.cfg = cfg
+        self.bity = bity
+        self.punkty = punkty
+        self.ostatni = time.monotonic()
+
+    def czy_czas(self):
+        return time.monotonic() - self.ostatni >= self.co_ile
+
+    def popros(self, proby):
+        self.ostatni = time.monotonic()
+        zapisz_punkt_kontrolny(self.sciezka, PunktKontrolny(TRYB_WYROZNIONE, self.cfg, proby, bity=self.bity,
+                                                            punkty=self.punkty))
+
+    def przyjmij(self, komunikat, proby):
+        pass
+
+    def zakoncz(self, wyniki, proby):
+        self.popros(proby)
+        return proby
+
+
+def _proces_roboczy(cel, nr, n, cfg, wyniki, *args):
+    #Ctrl+C trafia do całej grupy procesów; zatrzymaniem (i zapisem stanu) steruje proces główny
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        cel(nr, n, cfg, wyniki, *args)
+    except Exception:
+        #Bez tego proces główny czekałby na kolejce w nieskończoność
+        wyniki.put(("blad", nr, traceback.format_exc()))
+
+
+def _uruchom(cel, n, cfg, dodatkowe, stop, czas, limit, on_progress, partia, interwal,
+             na_punkty=None, skrzynki=False, zapis=None, baza_prob=0):
+    #Wspólna pętla procesu głównego: start procesów, zbieranie postępu i wyniku, sprzątanie.
+    #skrzynki=True - każdy proces dostaje jeszcze listę kolejek wejściowych wszystkich procesów.
+    #zapis - opcjonalny _Zapis*: punkty kontrolne co zapis.co_ile sekund i przy przerwaniu
+    ctx = multiprocessing.get_context()
+    stop_procesow = ctx.Event()
+    wyniki = ctx.Queue()
+    kolejki = [ctx.Queue() for _ in range(n)] if skrzynki else []
+    if skrzynki:
+        dodatkowe = tuple(dodatkowe) + (kolejki,)
+    procesy_robocze = [
+        ctx.Process(target=_proces_roboczy, args=(cel, nr, n, cfg, wyniki, stop_procesow, partia, interwal) + tuple(dodatkowe),
+                    daemon=True)
+        for nr in range(n)
+    ]
+    for p in procesy_robocze:
+        p.start()
+
+    start = time.monotonic()
+    postep = [0] * n
+
+    def sprawdz_procesy(martwy):
+        for nr, p in enumerate(procesy_robocze):
+            if martwy(p.exitcode):
+                raise RuntimeError(f"Błąd: proces roboczy {nr} zakończył się (kod {p.exitcode}) bez wyniku")
+
+    def petla():
+        while True:
+            #Proces zabity (np. przez system) nie wyśle komunikatu "blad"
+            sprawdz_procesy(lambda kod: kod is not None and kod != 0)
+            uplynelo = time.monotonic() - start
+            proby = baza_prob + sum(postep)
+            if stop is not None and stop.is_set():
+                return WynikAtaku("przerwano", proby, uplynelo)
+            if czas is not None and uplynelo >= czas:
+                return WynikAtaku("czas", proby, uplynelo)
+            if zapis is not None and zapis.czy_czas():
+                zapis.popros(proby)
+            try:
+                komunikat = wyniki.get(timeout=interwal)
+            except queue.Empty:
+                #Pusta kolejka, a proces już nie żyje - jego wynik (albo "blad") nie przyjdzie
+                sprawdz_procesy(lambda kod: kod is not None)
+                continue
+            if komunikat[0] == "blad":
+                raise RuntimeError(f"Błąd w procesie roboczym {komunikat[1]}:\n{komunikat[2]}")
+            rodzaj, nr, policzone = komunikat[:3]
+            postep[nr] = policzone
+            proby = baza_prob + sum(postep)
+            if rodzaj == "kolizja":
+                _, _, _, m1, m2, digest = komunikat
+                return WynikAtaku("kolizja", proby, time.monotonic() - start, m1, m2, digest)
+            if rodzaj == "punkty":
+                kolizja = na_punkty(komunikat[3])
+                if kolizja is not None:
+                    return WynikAtaku("kolizja", proby, time.monotonic() - start, *kolizja)
+            if rodzaj == "stan":
+                zapis.przyjmij(komunikat, proby)
+            if on_progress is not None:
+                on_progress(proby)
+            if limit is not None and proby > limit:
+                return WynikAtaku("limit", proby, time.monotonic() - start)
+
+    wynik = None
+    try:
+        wynik = petla()
+    finally:
+        stop_procesow.set()
+        #Po błędzie (wynik None) stany wszystkich procesów nie przyjdą - zostaje ostatni zapis okresowy
+        if zapis is not None and wynik is not None and not wynik.kolizja:
+            zapisane = zapis.zakoncz(wyniki, baza_prob + sum(postep))
+            if wynik is not None and zapisane is not None:
+                wynik.proby = zapisane      #ta sama liczba prób co w pliku (komunikaty "postep" bywają starsze)
+        for p in procesy_robocze:
+            p.join(timeout=2)
+            if p.is_alive():
+                p.terminate()
+        wyniki.cancel_join_thread()
+        for kolejka in kolejki:
+            kolejka.cancel_join_thread()
+    return wynik
+
+
+def _sprawdz_wznowienie(wznowienie, tryb, cfg):
+    if wznowienie is None:
+        return
+    if wznowienie.tryb != tryb:
+        raise ValueError("Błąd: punkt kontrolny pochodzi z innego trybu ataku")
+    if not wznowienie.pasuje(cfg):
+        raise ValueError("Błąd: punkt kontrolny dotyczy innych parametrów ataku")
+
+
+def birthday_attack(w, rounds, in_size, out_size, procesy=None, limit=None, czas=None,
+                    stop=None, on_progress=None, partia=1024, interwal=0.2,
+                    plik_kontrolny=None, co_ile=60.0, wznowienie=None):
+    """
+    Atak urodzinowy na procesy robocze (domyślnie wszystkie rdzenie). Blokuje do kolizji,
+    przekroczenia limitu prób, limitu czasu (s) albo ustawienia stop (threading.Event).
+    on_progress(proby) wołane co ~interwal sekund z wątku wywołującego. Zwraca WynikAtaku.
+    plik_kontrolny - zapis stanu co co_ile sekund i przy przerwaniu; wznowienie - PunktKontrolny
+    z wczytaj_punkt_kontrolny (liczba procesów może być inna niż przy zapisie).
+    """
+    cfg = {"w": w, "rounds": rounds, "in_size": in_size, "out_size": out_size}
+    _sprawdz_wznowienie(wznowienie, TRYB_URODZINOWY, cfg)
+    n = procesy or os.cpu_count() or 1
+    if wznowienie is not None:
+        ziarno, baza, baza_prob = wznowienie.ziarno, wznowienie.baza_licznika, wznowienie.proby
+        poczatkowe = (wznowienie.klucze, wznowienie.liczniki)
+    else:
+        ziarno, baza, baza_prob = os.urandom(16), 0, 0
+        poczatkowe = (np.zeros(0, dtype=typ_klucza(out_size)), np.zeros(0, dtype=np.uint64))
+    zadanie = zapis = None
+    if plik_kontrolny is not None:
+        zadanie = multiprocessing.get_context().Value('i', 0)
+        zapis = _ZapisUrodzinowy(plik_kontrolny, co_ile, n, cfg, ziarno, baza, baza_prob, partia, zadanie)
+    return _uruchom(_proces_urodzinowy, n, cfg, (ziarno, baza, poczatkowe, zadanie), stop, czas, limit,
+                    on_progress, partia, interwal, skrzynki=True, zapis=zapis, baza_prob=baza_prob)
+
+
+def rho_attack(w, rounds, in_size, out_size, procesy=None, limit=None, czas=None,
+               stop=None, on_progress=None, partia=1024, interwal=0.2, bity_wyroznione=None,
+               plik_kontrolny=None, co_ile=60.0, wznowienie=None):
+    """
+    Atak bez pamięci prób (wymaga in_size >= out_size). Jeden proces: metoda rho z wykrywaniem
+    cyklu Brenta. Więcej procesów: punkty wyróżnione - pamiętane są tylko końce ścieżek, więc
+    pamięć rośnie z liczbą punktów wyróżnionych (~ próby / 2**bity_wyroznione), nie z liczbą prób.
+    Parametry i wynik jak w birthday_attack; punkty kontrolne tylko w trybie punktów wyróżnionych.
+    """
+    cfg = {"w": w, "rounds": rounds, "in_size": in_size, "out_size": out_size}
+    f = _Iteracja(cfg)
+    n = procesy or os.cpu_count() or 1
+    if n == 1:
+        if plik_kontrolny is not None or wznowienie is not None:
+            raise ValueError("Błąd: tryb Brenta (1 proces) nie obsługuje punktów kontrolnych")
+        return _uruchom(_proces_brent, 1, cfg, (), stop, czas, limit, on_progress, partia, interwal)
+
+    _sprawdz_wznowienie(wznowienie, TRYB_WYROZNIONE, cfg)
+    if wznowienie is not None:
+        bity_wyroznione = wznowienie.bity
+    elif bity_wyroznione is None:
+        #ok. 2**16 punktów wyróżnionych przy spodziewanej liczbie prób 2**(bity wyjścia / 2)
+        bity_wyroznione = max(0, out_size * 4 - 16)
+    punkty = dict(wznowienie.punkty) if wznowienie is not None else {}     #punkt wyróżniony -> (początek ścieżki, długość)
+    zapis = None
+    if plik_kontrolny is not None:
+        zapis = _ZapisWyroznionych(plik_kontrolny, co_ile, cfg, bity_wyroznione, punkty)
+
+    def na_punkty(lista):
+        for digest, start, dlugosc in lista:
+            poprzedni = punkty.get(digest)
+            if poprzedni is None:
+                punkty[digest] = (start, dlugosc)
+            elif poprzedni[0] != start:
+                kolizja = _zlokalizuj(f, poprzedni[0], poprzedni[1], start, dlugosc)
+                if kolizja is not None:
+                    a, b, digest_kolizji = kolizja
+                    return f.wejscie(a), f.wejscie(b), digest_kolizji
+        return None
+
+    return _uruchom(_proces_wyroznione, n, cfg, (bity_wyroznione,), stop, czas, limit, on_progress,
+                    partia, interwal, na_punkty, zapis=zapis,
+                    baza_prob=wznowienie.proby if wznowienie is not None else 0)
+
+
+if __name__ == "__main__":
+    #Atak bez GUI (serwery, zadania wsadowe) - ten plik nie importuje tkinter ani matplotlib
+    import argparse
+    import json
+    import sys
+    import threading
+
+    TRYBY = {"urodzinowy": birthday_attack, "wyroznione": rho_attack, "brent": rho_attack}
+    parser = argparse.ArgumentParser(description='Atak kolizyjny na obcięty skrót Keccak (bez GUI)')
+    parser.add_argument('-w', type=int, default=64, help='Szerokość linii w (domyślnie 64)')
+    parser.add_argument('--rundy', type=int, default=24)
+    parser.add_argument('--wejscie', type=int, default=16, help='Długość wejścia w bajtach (domyślnie 16)')
+    parser.add_argument('--wyjscie', type=int, default=2, help='Długość skrótu w bajtach (domyślnie 2)')
+    parser.add_argument('--tryb', default='urodzinowy', choices=TRYBY)
+    parser.add_argument('-j', '--procesy', type=int, default=None, help='Liczba procesów (domyślnie liczba rdzeni; brent - zawsze 1)')
+    parser.add_argument('--czas', type=float, default=None, help='Limit czasu w sekundach')
+    parser.add_argument('--limit', type=int, default=None, help='Limit liczby prób')
+    parser.add_argument('--json', default=None, help='Plik na wynik w JSON ("-" - standardowe wyjście)')
+    parser.add_argument('--punkt-kontrolny', default=None, help='Plik kontrolny zapisywany w trakcie i przy przerwaniu')
+    parser.add_argument('--co-ile', type=float, default=60.0, help='Odstęp między punktami kontrolnymi w sekundach')
+    parser.add_argument('--wznow', default=None, help='Wznów atak z pliku kontrolnego (parametry z pliku)')
+    args = parser.parse_args()
+    if args.procesy is not None and args.procesy < 1:
+        parser.error("liczba procesów (-j) musi być dodatnia")
+
+    wznowienie = None
+    if args.wznow:
+        wznowienie = wczytaj_punkt_kontrolny(args.wznow)
+        args.w, args.rundy = wznowienie.cfg['w'], wznowienie.cfg['rounds']
+        args.wejscie, args.wyjscie = wznowienie.cfg['in_size'], wznowienie.cfg['out_size']
+        if args.tryb == 'brent' or (wznowienie.tryb == TRYB_WYROZNIONE) != (args.tryb == 'wyroznione'):
+            args.tryb = 'urodzinowy' if wznowienie.tryb == TRYB_URODZINOWY else 'wyroznione'
+    procesy = 1 if args.tryb == 'brent' else (args.procesy or os.cpu_count() or 1)
+    if args.tryb == 'wyroznione' and procesy == 1:
+        parser.error("tryb wyroznione wymaga co najmniej 2 procesów (dla 1 procesu użyj --tryb brent)")
+
+    #Ctrl+C kończy atak łagodnie: procesy są zatrzymywane, a wynik (i punkt kontrolny) zapisany
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    start = time.monotonic()
+    poczatkowe = wznowienie.proby if wznowienie is not None else 0     #przepustowość tylko z tego uruchomienia
+
+    def on_progress(proby):
+        uplynelo = time.monotonic() - start
+        na_sekunde = (proby - poczatkowe) / uplynelo if uplynelo > 0 else 0
+        print(f"\rpróby: {proby}  {na_sekunde:,.0f} H/s", end='', file=sys.stderr, flush=True)
+
+    kontrola = {}
+    if args.punkt_kontrolny or wznowienie is not None:
+        kontrola = {"plik_kontrolny": args.punkt_kontrolny, "co_ile": args.co_ile, "wznowienie": wznowienie}
+    print(f"w={args.w} rundy={args.rundy} wejście={args.wejscie} B wyjście={args.wyjscie} B "
+          f"tryb={args.tryb} procesy={procesy}", file=sys.stderr)
+    try:
+        wynik = TRYBY[args.tryb](args.w, args.rundy, args.wejscie, args.wyjscie, procesy=procesy, limit=args.limit,
+                                czas=args.czas, stop=stop, on_progress=on_progress, interwal=1.0, **kontrola)
+    except (ValueError, RuntimeError) as e:
+        print(f"\ncollision.py: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(file=sys.stderr)
+
+    #Oczekiwana liczba prób do pierwszej kolizji: sqrt(pi * N / 2), N = 2^(8 * wyjście)
+    oczekiwane_proby = math.sqrt(math.pi * 2**(args.wyjscie * 8) / 2)
+    prawdopodobienstwo = calculate_prob(wynik.proby, args.wyjscie)
+    #Przy --json - standardowe wyjście to czysty JSON, podsumowanie idzie na stderr
+    podsumowanie = sys.stderr if args.json == '-' else sys.stdout
+    na_sekunde = (wynik.proby - poczatkowe) / wynik.czas if wynik.czas > 0 else 0.0
+    print(f"Wynik:            {wynik.powod}", file=podsumowanie)
+    print(f"Próby:            {wynik.proby} (oczekiwane do kolizji: {oczekiwane_proby:.0f})", file=podsumowanie)
+    print(f"Czas:             {wynik.czas:.2f} s", file=podsumowanie)
+    print(f"Przepustowość:    {na_sekunde:,.0f} skrótów/s", file=podsumowanie)
+    print(f"P(kolizja) oczekiwane po {wynik.proby} próbach: {prawdopodobienstwo:.4f}%, "
+          f"zaobserwowane: {'100' if wynik.kolizja else '0'}%", file=podsumowanie)
+    if wynik.kolizja:
+        print(f"Skrót (HEX):      {wynik.digest.hex().upper()}", file=podsumowanie)
+        print(f"M1:               {wynik.m1.hex()}", file=podsumowanie)
+        print(f"M2:               {wynik.m2.hex()}", file=podsumowanie)
+
+    if args.json:
+        dane = {
+            "w": args.w, "rounds": args.rundy, "in_size": args.wejscie, "out_size": args.wyjscie,
+            "tryb": args.tryb, "procesy": procesy,
+            "powod": wynik.powod, "kolizja": wynik.kolizja,
+            "proby": wynik.proby, "czas": wynik.czas, "skroty_na_sekunde": na_sekunde,
+            "prawdopodobienstwo_oczekiwane": prawdopodobienstwo,
+            "prawdopodobienstwo_zaobserwowane": 100.0 if wynik.kolizja else 0.0,
+            "oczekiwane_proby": oczekiwane_proby,
+            "m1": wynik.m1.hex() if wynik.kolizja else None,
+            "m2": wynik.m2.hex() if wynik.kolizja else None,
+            "skrot": wynik.digest.hex() if wynik.kolizja else None,
+        }
+        if args.json == '-':
+            print(json.dumps(dane, indent=2, ensure_ascii=False))
+        else:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(dane, f, indent=2, ensure_ascii=False)
+    sys.exit(0 if wynik.kolizja else 1)
@@ -0,0 +1,98 @@
+#Tryb licznikowy keystreamu: blok i = wyciśnięcie z gąbki nad key || IV || i (i jako 8 bajtów little-endian).
+#Stan po wchłonięciu key || IV liczy się raz i klonuje dla każdego bloku, więc każdy blok jest
+#niezależny: swobodny dostęp (bajty od dowolnego offsetu) i podział szyfrowania między procesy.
+#W odróżnieniu od encrypt_stream bajt k nie wymaga wszystkich wcześniejszych permutacji.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from keccak import KeccakLaneSponge, xor_bajtow
+
+
+class CounterKeystream:
+    def __init__(self, key_bytes, iv=None, rate=1088, capacity=512, w=64, rounds=24):
+        self.prefiks = KeccakLaneSponge(rate, capacity, w, rounds)
+        self.prefiks.wchlon_klucz(key_bytes, iv)
+        self.rozmiar_bloku = self.prefiks.rate_in_bytes
+
+    def blok(self, i):
+        g = self.prefiks.copy()
+        g.wchlanianie(i.to_bytes(8, 'little'))
+        return g.wyciskanie(self.rozmiar_bloku)
+
+    def keystream(self, offset, length):
+        """length bajtów keystreamu od pozycji offset - liczone są tylko potrzebne bloki."""
+        R = self.rozmiar_bloku
+        pierwszy, przesuniecie = divmod(offset, R)
+        out = bytearray()
+        i = pierwszy
+        while len(out) < przesuniecie + length:
+            out += self.blok(i)
+            i += 1
+        return bytes(out[przesuniecie:przesuniecie + length])
+
+    def xor(self, data_bytes, offset=0):
+        """Szyfruje/deszyfruje dane leżące w strumieniu od pozycji offset."""
+        with memoryview(data_bytes) as mv:
+            dane = mv.cast('B')
+            out = bytearray(len(dane))
+            R = self.rozmiar_bloku
+            poz = 0
+            while poz < len(dane):
+                i, w_bloku = divmod(offset + poz, R)
+                n = min(R - w_bloku, len(dane) - poz)
+                out[poz:poz + n] = xor_bajtow(dane[poz:poz + n], self.blok(i)[w_bloku:])
+                poz += n
+        return bytes(out)
+
+
+def _szyfruj_fragment(args):
+    key_bytes, iv, parametry, fragment, offset = args
+    return CounterKeystream(key_bytes, iv, **parametry).xor(fragment, offset)
+
+
+def encrypt_parallel(key_bytes, data_bytes, iv=None, procesy=None, offset=0, **parametry):
+    """
+    Szyfrowanie (i deszyfrowanie) w trybie licznikowym rozłożone na pulę procesów.
+    Dane dzielone są na fragmenty wyrównane do bloku; każdy proces liczy swoje bloki sam.
+    parametry - rate/capacity/w/rounds jak w CounterKeystream.
+    """
+    procesy = procesy or os.cpu_count() or 1
+    R = CounterKeystream(key_bytes, iv, **parametry).rozmiar_bloku
+    data_bytes = bytes(data_bytes)
+    if procesy == 1 or len(data_bytes) <= R:
+        return CounterKeystream(key_bytes, iv, **parametry).xor(data_bytes, offset)
+
+    #Po kilka fragmentów na proces, żeby wolniejsze procesy nie hamowały całości
+    bloki = -(-len(data_bytes) // R)
+    na_fragment = max(1, -(-bloki // (procesy * 4))) * R
+    zadania = [(key_bytes, iv, parametry, data_bytes[p:p + na_fragment], offset + p)
+               for p in range(0, len(data_bytes), na_fragment)]
+    with ProcessPoolExecutor(max_workers=procesy) as pula:
+        return b''.join(pula.map(_szyfruj_fragment, zadania))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark trybu licznikowego: skalowanie na rdzeniach')
+    parser.add_argument('--rozmiar', type=int, default=2, help='Rozmiar danych w MB (domyślnie 2)')
+    parser.add_argument('--rundy', type=int, default=24)
+    args = parser.parse_args()
+
+    dane = os.urandom(args.rozmiar * 1024 * 1024)
+    klucz, iv = b"benchmark-key", os.urandom(16)
+    rdzenie = os.cpu_count() or 1
+    liczby = sorted({1, 2, 4, 8, 16, 32, rdzenie} & set(range(1, rdzenie + 1)))
+
+    print(f"Dane: {args.rozmiar} MB, rundy: {args.rundy}, rdzenie: {rdzenie}")
+    wzorzec = None
+    czas_1 = None
+    for p in liczby:
+        t = time.perf_counter()
+        wynik = encrypt_parallel(klucz, dane, iv, procesy=p, rounds=args.rundy)
+        dt = time.perf_counter() - t
+        if wzorzec is None:
+            wzorzec, czas_1 = wynik, dt
+        assert wynik == wzorzec, "Wynik zależy od liczby procesów!"
+        print(f"procesy={p:3d}  {args.rozmiar / dt:8.3f} MB/s  przyspieszenie x{czas_1 / dt:.2f}")
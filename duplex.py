@@ -0,0 +1,108 @@
+#Szyfrowanie uwierzytelnione w jednym przejściu (konstrukcja duplex / SpongeWrap).
+#Każdy blok wiadomości jest wchłaniany i w tej samej permutacji wyciskany jest keystream dla
+#następnego bloku, a na końcu znacznik (tag). Zamiast encrypt_stream + osobnego skrótu
+#szyfrogramu dane czytane są raz i permutowane raz.
+
+import hmac
+from keccak import KeccakLaneSponge, xor_bajtow
+
+
+class KeccakDuplex:
+    """
+    Obiekt duplex na KeccakLaneSponge: duplexing(blok, ramka, length) wchłania blok
+    (do rate_in_bytes - 1 bajtów) z bitem ramki i paddingiem, permutuje i od razu zwraca
+    length bajtów wyjścia. Bajt za blokiem to ramka | 0x02 (początek paddingu 10*1).
+    """
+    def __init__(self, rate=1088, capacity=512, w=64, rounds=24):
+        self.gabka = KeccakLaneSponge(rate, capacity, w, rounds)
+        self.rozmiar_bloku = self.gabka.rate_in_bytes - 1
+
+    def duplexing(self, blok, ramka, length):
+        P = bytearray(blok)
+        P.append(ramka | 0x02)
+        P.extend(b'\x00' * (self.gabka.rate_in_bytes - len(P)))
+        P[-1] ^= 0x80
+        self.gabka.xorowanie_do_stanu(P)
+        self.gabka.keccak_f()
+        return bytes(self.gabka.stan_na_bajty(length))
+
+
+class SpongeWrap:
+    """
+    Strumieniowe szyfrowanie/deszyfrowanie z uwierzytelnieniem.
+    Nagłówek (klucz, IV, dane dodatkowe) idzie blokami z ramką 0, ostatni z ramką 1;
+    bloki wiadomości z ramką 1, a ostatni (być może pusty) z ramką 0 daje znacznik.
+    Pełny blok wiadomości jest wchłaniany dopiero, gdy przyjdą kolejne dane - wtedy wiadomo,
+    że nie jest ostatni. Jeden obiekt służy albo do szyfrowania, albo do deszyfrowania.
+    Uwaga: decrypt() oddaje tekst jawny przed sprawdzeniem znacznika (verify()).
+    """
+    def __init__(self, key_bytes, iv=b'', dane_dodatkowe=b'', dlugosc_znacznika=16, **parametry):
+        self.duplex = KeccakDuplex(**parametry)
+        rho = self.duplex.rozmiar_bloku
+        if not 0 < dlugosc_znacznika <= rho + 1:
+            raise ValueError(f"Błąd: długość znacznika musi być w zakresie 1..{rho + 1} bajtów")
+        if len(key_bytes) > 255 or len(iv) > 255:
+            raise ValueError("Błąd: klucz i IV mogą mieć najwyżej 255 bajtów")
+        self.dlugosc_znacznika = dlugosc_znacznika
+        self.tryb = None
+
+        naglowek = bytes([len(key_bytes)]) + bytes(key_bytes) + bytes([len(iv)]) + bytes(iv) + bytes(dane_dodatkowe)
+        bloki = [naglowek[i:i + rho] for i in range(0, len(naglowek), rho)]
+        for blok in bloki[:-1]:
+            self.duplex.duplexing(blok, 0, 0)
+        self.Z = self.duplex.duplexing(bloki[-1], 1, rho)    #keystream pierwszego bloku wiadomości
+        self.oczekujacy = bytearray()                         #bieżący blok tekstu jawnego (jeszcze niewchłonięty)
+
+    def _przetworz(self, data_bytes, tryb):
+        if self.tryb not in (None, tryb):
+            raise ValueError("Błąd: obiekt SpongeWrap służy albo do szyfrowania, albo do deszyfrowania")
+        if self.Z is None:
+            raise ValueError("Błąd: po finalize()/verify() nie można dodawać danych")
+        self.tryb = tryb
+        rho = self.duplex.rozmiar_bloku
+        out = bytearray()
+        with memoryview(data_bytes) as mv:
+            dane = mv.cast('B')
+            poz = 0
+            while poz < len(dane):
+                if len(self.oczekujacy) == rho:
+                    #Przyszły kolejne dane, więc pełny blok nie jest ostatni: ramka 1
+                    self.Z = self.duplex.duplexing(self.oczekujacy, 1, rho)
+                    self.oczekujacy = bytearray()
+                start = len(self.oczekujacy)
+                n = min(rho - start, len(dane) - poz)
+                wynik = xor_bajtow(dane[poz:poz + n], self.Z[start:start + n])
+                self.oczekujacy += dane[poz:poz + n] if tryb == "szyfrowanie" else wynik
+                out += wynik
+                poz += n
+        return bytes(out)
+
+    def encrypt(self, data_bytes):
+        return self._przetworz(data_bytes, "szyfrowanie")
+
+    def decrypt(self, data_bytes):
+        return self._przetworz(data_bytes, "deszyfrowanie")
+
+    def finalize(self):
+        """Wchłania ostatni blok z ramką 0 i zwraca znacznik."""
+        if self.Z is None:
+            raise ValueError("Błąd: finalize() można wywołać tylko raz")
+        self.Z = None
+        return self.duplex.duplexing(self.oczekujacy, 0, self.dlugosc_znacznika)
+
+    def verify(self, znacznik):
+        return hmac.compare_digest(self.finalize(), znacznik)
+
+
+def wrap(key_bytes, data_bytes, iv=b'', dane_dodatkowe=b'', dlugosc_znacznika=16, **parametry):
+    sw = SpongeWrap(key_bytes, iv, dane_dodatkowe, dlugosc_znacznika, **parametry)
+    szyfrogram = sw.encrypt(data_bytes)
+    return szyfrogram, sw.finalize()
+
+
+def unwrap(key_bytes, szyfrogram, znacznik, iv=b'', dane_dodatkowe=b'', **parametry):
+    sw = SpongeWrap(key_bytes, iv, dane_dodatkowe, len(znacznik), **parametry)
+    tekst = sw.decrypt(szyfrogram)
+    if not sw.verify(znacznik):
+        raise ValueError("Błąd: niepoprawny znacznik - dane zostały zmienione albo klucz jest zły")
+    return tekst
@@ -0,0 +1,153 @@
+#Front-end zgodny z hashlib: SHA3-224/256/384/512 i SHAKE128/256 (FIPS 202) na KeccakLaneSponge.
+#Obiekty mają update/digest/hexdigest/copy, digest_size i block_size, więc można je podać
+#wszędzie tam, gdzie kod oczekuje obiektu z hashlib.
+
+import sys
+import mmap
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from keccak import KeccakLaneSponge
+
+SUFIKS_SHA3 = 0x06      #01 + początek paddingu
+SUFIKS_SHAKE = 0x1F     #1111 + początek paddingu
+SUFIKS_KECCAK = 0x01    #sam padding (oryginalny Keccak)
+
+
+class _Keccak:
+    name = None
+    digest_size = 0
+    _capacity = 0
+    _sufiks = None
+
+    def __init__(self, data=b'', *, usedforsecurity=True):
+        self._gabka = KeccakLaneSponge(1600 - self._capacity, self._capacity, 64, 24, sufiks=self._sufiks)
+        if data:
+            self.update(data)
+
+    @property
+    def block_size(self):
+        return self._gabka.rate_in_bytes
+
+    def update(self, data):
+        self._gabka.update(data)
+
+    def copy(self):
+        #Kopia stanu pośredniego (midstate): wspólny prefiks wchłania się raz, a potem rozgałęzia
+        kopia = object.__new__(type(self))
+        kopia._gabka = self._gabka.copy()
+        return kopia
+
+
+class _Sha3(_Keccak):
+    _sufiks = SUFIKS_SHA3
+
+    def digest(self):
+        return self._gabka.digest(self.digest_size)
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+class _Shake(_Keccak):
+    _sufiks = SUFIKS_SHAKE
+
+    def digest(self, length):
+        return self._gabka.digest(length)
+
+    def hexdigest(self, length):
+        return self.digest(length).hex()
+
+
+class sha3_224(_Sha3):
+    name = 'sha3_224'
+    digest_size = 28
+    _capacity = 448
+
+
+class sha3_256(_Sha3):
+    name = 'sha3_256'
+    digest_size = 32
+    _capacity = 512
+
+
+class sha3_384(_Sha3):
+    name = 'sha3_384'
+    digest_size = 48
+    _capacity = 768
+
+
+class sha3_512(_Sha3):
+    name = 'sha3_512'
+    digest_size = 64
+    _capacity = 1024
+
+
+class shake_128(_Shake):
+    name = 'shake_128'
+    _capacity = 256
+
+
+class shake_256(_Shake):
+    name = 'shake_256'
+    _capacity = 512
+
+
+ALGORYTMY = {cls.name: cls for cls in (sha3_224, sha3_256, sha3_384, sha3_512, shake_128, shake_256)}
+
+
+def new(name, data=b'', **kwargs):
+    try:
+        cls = ALGORYTMY[name.lower().replace('-', '_')]
+    except KeyError:
+        raise ValueError(f"Nieobsługiwany algorytm: {name}") from None
+    return cls(data, **kwargs)
+
+
+ROZMIAR_PORCJI = 1 << 20    #bufor dla plików, których nie da się zmapować (potoki, urządzenia)
+
+
+def hash_pliku(sciezka, algorytm='sha3_256', dlugosc=None):
+    """
+    Skrót pliku bez wczytywania go do bytes: mmap (wchłanianie prosto z mapowania)
+    albo readinto do jednego, wielokrotnie używanego bufora. dlugosc - tylko dla SHAKE.
+    Ścieżka "-" to standardowe wejście (jak w sha3sum).
+    """
+    h = new(algorytm)
+    with (open(sys.stdin.fileno(), 'rb', closefd=False) if sciezka == '-' else open(sciezka, 'rb')) as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        except (ValueError, OSError):   #pusty plik albo coś, czego nie da się zmapować
+            bufor = bytearray(ROZMIAR_PORCJI)
+            with memoryview(bufor) as mv:
+                while True:
+                    n = f.readinto(bufor)
+                    if not n:
+                        break
+                    h.update(mv[:n])
+    return h.hexdigest(dlugosc) if isinstance(h, _Shake) else h.hexdigest()
+
+
+def hash_plikow(sciezki, algorytm='sha3_256', dlugosc=None, procesy=None):
+    """
+    Generator (ścieżka, hex albo wyjątek) w kolejności kończenia - przy wielu plikach
+    każdy liczony jest w osobnym procesie z puli. Standardowe wejście ("-") zawsze w tym procesie.
+    """
+    if len(sciezki) == 1 or procesy == 1:
+        for sciezka in sciezki:
+            try:
+                yield sciezka, hash_pliku(sciezka, algorytm, dlugosc)
+            except OSError as e:
+                yield sciezka, e
+        return
+    if '-' in sciezki:
+        yield from hash_plikow([s for s in sciezki if s == '-'], algorytm, dlugosc, 1)
+        sciezki = [s for s in sciezki if s != '-']
+        if not sciezki:
+            return
+    with ProcessPoolExecutor(max_workers=procesy) as pula:
+        zadania = {pula.submit(hash_pliku, s, algorytm, dlugosc): s for s in sciezki}
+        for zadanie in as_completed(zadania):
+            try:
+                yield zadania[zadanie], zadanie.result()
+            except OSError as e:
+                yield zadania[zadanie], e
@@ -1,8 +1,34 @@
 import math
+import copy
 from operations import theta, rho, pi, chi, rc, iota
+from lanes import (theta_linie, rho_linie, pi_linie, chi_linie, iota_linie, plan_permutacji,
+                   stan_na_linie, linie_na_stan, bajty_na_linie, linie_na_bajty, WidokStanu)
+
+def xor_bajtow(dane, klucz):
+    #XOR całego bloku naraz (jako liczby) zamiast bajt po bajcie; klucz może być dłuższy
+    n = len(dane)
+    return (int.from_bytes(dane, 'little') ^ int.from_bytes(klucz[:n], 'little')).to_bytes(n, 'little')
+
+
+def porcje_danych(zrodlo, rozmiar_porcji):
+    #Porcje z pliku (read), obiektu z protokołem bufora albo dowolnej sekwencji porcji
+    if hasattr(zrodlo, 'read'):
+        while True:
+            porcja = zrodlo.read(rozmiar_porcji)
+            if not porcja:
+                return
+            yield porcja
+    try:
+        mv = memoryview(zrodlo).cast('B')
+    except TypeError:
+        yield from zrodlo
+        return
+    for poz in range(0, len(mv), rozmiar_porcji):
+        yield mv[poz:poz + rozmiar_porcji]
+
 
 class KeccakSponge:
-    def __init__(self, rate, capacity, w, rounds):
+    def __init__(self, rate, capacity, w, rounds, sufiks=0x06):
         self.state_width = 25 * w
         if (rate+capacity) != self.state_width:
             raise ValueError(f"Błąd: rate ({rate}) + capacity ({capacity}) musi być równe {self.state_width} (25 * w)")
@@ -10,10 +36,18 @@ class KeccakSponge:
         self.capacity = capacity
         self.w = w
         self.rounds = rounds
-        self.bytes_per_lane = w // 8    #lane - ile bajtów ma jedna komórka macierzy
+        self.bytes_per_lane = w // 8    #lane - ile bajtów ma jedna komórka macierzy (0 dla w < 8 - linie nie są wtedy wyrównane do bajtów)
         self.rate_in_bytes = rate // 8  #rate - ile bajtów wchłaniamy w jednym cyklu
+        if self.rate_in_bytes <= 0:
+            raise ValueError(f"Błąd: rate ({rate}) musi mieć co najmniej 8 bitów")
+        self.sufiks = sufiks    #bity separacji domen (FIPS 202): 0x06 SHA-3, 0x1F SHAKE, 0x01 czysty Keccak
+        self.plan = plan_permutacji(w, rounds)  #wspólny (cache) dla wszystkich gąbek o tych samych (w, rounds)
+        self.tracer = None  #np. tracer.StepTracer - callback używany, gdy keccak_f wywołano bez własnego
 
-        self.state = [[[0] * w for _ in range(5)] for _ in range(5)]
+        self.reset_stanu()
+
+    def reset_stanu(self):
+        self.state = [[[0] * self.w for _ in range(5)] for _ in range(5)]
         self.bufor = bytearray()
 
     def wykonaj_pojedyncza_runde(self, numer_rundy, callback=None):
@@ -36,6 +70,11 @@ class KeccakSponge:
         if callback: callback("Iota", self.state)
     
     def keccak_f(self, callback=None):
+        callback = callback or self.tracer
+        if callback is None:
+            #Bez callbacku nie trzeba stanów pośrednich - skompilowana permutacja z planu
+            self.state = linie_na_stan(self.plan.keccak_f(stan_na_linie(self.state, self.w)), self.w)
+            return
         for i in range(self.rounds):
             self.wykonaj_pojedyncza_runde(i, callback)
 
@@ -43,37 +82,95 @@ class KeccakSponge:
         """
         Prosty szyfr strumieniowy (Sponge Duplex-like).
         1. Wchłonąć klucz (i opcjonalnie IV).
-        2. Wycisnąć tyle bajtów ile ma wiadomość (keystream).
-        3. XOR wiadomość ^ keystream.
+        2. Wyciskać keystream blokami po rate_in_bytes (strumien_klucza).
+        3. XOR wiadomość ^ keystream całymi blokami, prosto do gotowego bufora wyjścia.
         """
+        self.wchlon_klucz(key_bytes, iv)
+
+        with memoryview(data_bytes) as mv:
+            dane = mv.cast('B')
+            encrypted = bytearray(len(dane))
+            #Dokładnie tyle bloków, ile potrzeba - generator permutuje dopiero przy kolejnym next()
+            strumien = self.strumien_klucza()
+            for poz in range(0, len(dane), self.rate_in_bytes):
+                n = min(self.rate_in_bytes, len(dane) - poz)
+                encrypted[poz:poz + n] = xor_bajtow(dane[poz:poz + n], next(strumien))
+
+        return bytes(encrypted)
+
+    def encrypt_iter(self, key_bytes, zrodlo, iv=None, rozmiar_porcji=1 << 16):
+        """
+        Strumieniowa wersja encrypt_stream (ten sam keystream): zrodlo to bytes/memoryview,
+        plik (read) albo iterowalna sekwencja porcji; zwraca kolejne porcje szyfrogramu.
+        Pamięć O(porcja + rate) zamiast O(wiadomość). Deszyfrowanie to to samo wywołanie.
+        """
+        self.wchlon_klucz(key_bytes, iv)
+        strumien = self.strumien_klucza()
+        zapas = b''     #niewykorzystana końcówka ostatniego bloku keystreamu
+        for porcja in porcje_danych(zrodlo, rozmiar_porcji):
+            n = len(porcja)
+            if not n:
+                continue
+            ks = bytearray(zapas)
+            while len(ks) < n:
+                ks += next(strumien)
+            zapas = bytes(ks[n:])
+            yield xor_bajtow(porcja, ks)
+
+    def wchlon_klucz(self, key_bytes, iv=None):
         # Reset i wchłonięcie klucza
-        self.bufor = bytearray()
-        self.state = [[[0] * self.w for _ in range(5)] for _ in range(5)]
-        
-        to_absorb = bytearray(key_bytes)
+        self.reset_stanu()
+        self.wchlanianie(key_bytes)
         if iv:
-            to_absorb.extend(iv)
-            
-        self.wchlanianie(to_absorb)
-        
-        # Wygenerowanie strumienia klucza
-        keystream = self.wyciskanie(len(data_bytes))
-        
-        # Szyfrowanie (XOR)
-        encrypted = bytearray()
-        for b_msg, b_key in zip(data_bytes, keystream):
-            encrypted.append(b_msg ^ b_key)
-            
-        return bytes(encrypted)
+            self.wchlanianie(iv)
 
-    def wchlanianie(self, input_bytes):
-        self.bufor.extend(input_bytes)
-        while len(self.bufor) >= self.rate_in_bytes:
-            block = self.bufor[:self.rate_in_bytes]
-            self.bufor = self.bufor[self.rate_in_bytes:]
-            self.xorowanie_do_stanu(block)
+    def strumien_klucza(self):
+        """Generator keystreamu: padding raz, a potem leniwie blok rate_in_bytes i permutacja."""
+        self.padding_i_wchlanianie()
+        while True:
+            yield bytes(self.stan_na_bajty(self.rate_in_bytes))
             self.keccak_f()
 
+    def wchlanianie(self, input_bytes):
+        """
+        Przyjmuje dowolny obiekt z protokołem bufora (bytes, bytearray, memoryview, mmap).
+        Pełne bloki są wchłaniane prosto z memoryview (bez kopiowania), do bufora trafia
+        tylko niepełna końcówka. Można wołać wielokrotnie - padding dopiero w wyciskanie().
+        """
+        rb = self.rate_in_bytes
+        with memoryview(input_bytes) as mv:
+            dane = mv.cast('B')
+            poz = 0
+            if self.bufor:  #najpierw dopełniamy końcówkę z poprzedniego wywołania
+                poz = rb - len(self.bufor)
+                self.bufor.extend(dane[:poz])
+                if len(self.bufor) < rb:
+                    return
+                self.xorowanie_do_stanu(self.bufor)
+                self.keccak_f()
+                self.bufor = bytearray()
+            while poz + rb <= len(dane):
+                self.xorowanie_do_stanu(dane[poz:poz + rb])
+                self.keccak_f()
+                poz += rb
+            self.bufor.extend(dane[poz:])
+
+    def update(self, data):
+        self.wchlanianie(data)
+
+    def digest(self, output_length_bytes):
+        #Wyciskanie na kopii - obiekt zostaje gotowy na kolejne update()
+        return self.copy().wyciskanie(output_length_bytes)
+
+    def hexdigest(self, output_length_bytes):
+        return self.digest(output_length_bytes).hex()
+
+    def copy(self):
+        kopia = copy.copy(self)
+        kopia.bufor = bytearray(self.bufor)
+        kopia.state = [[list(lane) for lane in plane] for plane in self.state]
+        return kopia
+
     def wyciskanie(self, output_length_bytes):
         self.padding_i_wchlanianie()    #jesli cos jeszcze nie zostało wchłoniete bo to co w buforze mniejsze od rates_in_bytes
         output = bytearray()
@@ -88,22 +185,16 @@ class KeccakSponge:
         needed = self.rate_in_bytes - len(self.bufor)   #ile bajtów potrzeba do pełnego bloku
         pad_block = bytearray(self.bufor)
         if needed == 1: #tu w jednym bajcie będziemy zaczynali od 10 i konczyli na 01
-            pad_block.append(0x86)
+            pad_block.append(self.sufiks | 0x80)
         else:
-            pad_block.append(0x06)
+            pad_block.append(self.sufiks)
             pad_block.extend(b'\x00' * (needed-2))
             pad_block.append(0x80)
         self.xorowanie_do_stanu(pad_block)
         self.keccak_f()
         
     def xorowanie_do_stanu(self, block_bytes): #zamieniamy bajty na macierz liczb całkowitych (zgodnie z 'w') i wkonuje XOR ze stanem
-        input_lanes = []
-        for i in range(0, len(block_bytes), self.bytes_per_lane):
-            chunk = block_bytes[i:(i+self.bytes_per_lane)]
-            if len(chunk) < self.bytes_per_lane:
-                chunk += b'\x00' * (self.bytes_per_lane - len(chunk))
-            val = int.from_bytes(chunk, 'little')
-            input_lanes.append(val)
+        input_lanes = bajty_na_linie(block_bytes, self.w)  #działa też dla w < 8 (linia nie musi mieć pełnych bajtów)
         idx = 0
         for y in range(5):
             for x in range(5):
@@ -116,20 +207,102 @@ class KeccakSponge:
                 else: return
 
     def stan_na_bajty(self, length):
-        out = bytearray()
+        lanes = []
         for y in range(5):
             for x in range(5):
                 val = 0
                 for z in range(self.w):
                     if self.state[x][y][z] == 1:
                         val |= (1 << z)
-                lane_bytes = val.to_bytes(self.bytes_per_lane, 'little')
-                out.extend(lane_bytes)
-                if len(out) >= length: return out[:length]
-        return out
-    
+                lanes.append(val)
+        return linie_na_bajty(lanes, self.w, length)
+
+
+class KeccakLaneSponge(KeccakSponge):
+    """
+    Ta sama gąbka, ale stan trzymany jako 25 linii (liczb całkowitych po w bitów).
+    Kroki rundy działają na całych liniach (rotacje, XOR, AND-NOT), a wchłanianie
+    i wyciskanie XOR-ują/odczytują całe linie zamiast pojedynczych bitów.
+    `state` to widok tylko do odczytu (state[x][y][z]) - callbacki działają bez zmian.
+    """
+    def reset_stanu(self):
+        self.linie = [0] * 25
+        self.maska = (1 << self.w) - 1
+        self.bufor = bytearray()
+
+    @property
+    def state(self):
+        return WidokStanu(self.linie, self.w)
+
+    def wykonaj_pojedyncza_runde(self, numer_rundy, callback=None):
+        self.linie = theta_linie(self.linie, self.w, self.maska)
+        if callback: callback("Theta", self.state)
+
+        self.linie = rho_linie(self.linie, self.w, self.maska)
+        if callback: callback("Rho", self.state)
+
+        self.linie = pi_linie(self.linie)
+        if callback: callback("Pi", self.state)
+
+        self.linie = chi_linie(self.linie)
+        if callback: callback("Chi", self.state)
+
+        self.linie = iota_linie(self.linie, self.plan.stale_rund[numer_rundy])
+        if callback: callback("Iota", self.state)
+
+    def keccak_f(self, callback=None):
+        callback = callback or self.tracer
+        if callback is None:
+            self.linie = self.plan.keccak_f(self.linie)
+            return
+        for i in range(self.rounds):
+            self.wykonaj_pojedyncza_runde(i, callback)
+
+    def copy(self):
+        kopia = copy.copy(self)
+        kopia.bufor = bytearray(self.bufor)
+        kopia.linie = list(self.linie)
+        return kopia
+
+    def xorowanie_do_stanu(self, block_bytes):
+        for i, val in enumerate(bajty_na_linie(block_bytes, self.w)):
+            self.linie[i] ^= val
+
+    def stan_na_bajty(self, length):
+        return linie_na_bajty(self.linie, self.w, length)
+
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+
+    #Algorytmy jak w sha3sum (-a); SHAKE domyślnie wypisuje pełny blok rate
+    ALGORYTMY = {
+        "224": ("sha3_224", None), "256": ("sha3_256", None),
+        "384": ("sha3_384", None), "512": ("sha3_512", None),
+        "128000": ("shake_128", 168), "256000": ("shake_256", 136),
+    }
+    parser = argparse.ArgumentParser(description='Skróty SHA-3 plików (format zgodny z sha3sum)')
+    parser.add_argument('pliki', nargs='*', help='Pliki do policzenia, "-" to standardowe wejście (bez plików - przykład dla b"krypto")')
+    parser.add_argument('-a', '--algorytm', default='256', choices=ALGORYTMY, help='Wariant SHA-3/SHAKE (domyślnie 256)')
+    parser.add_argument('-j', '--procesy', type=int, default=None, help='Liczba procesów dla wielu plików (domyślnie liczba rdzeni)')
+    args = parser.parse_args()
+    if args.procesy is not None and args.procesy < 1:
+        parser.error("liczba procesów (-j) musi być dodatnia")
+
+    if args.pliki:
+        from fips202 import hash_plikow
+
+        algorytm, dlugosc = ALGORYTMY[args.algorytm]
+        kod = 0
+        for sciezka, wynik in hash_plikow(args.pliki, algorytm, dlugosc, args.procesy):
+            if isinstance(wynik, Exception):
+                print(f"keccak.py: {sciezka}: {wynik.strerror or wynik}", file=sys.stderr)
+                kod = 1
+            else:
+                print(f"{wynik}  {sciezka}", flush=True)
+        sys.exit(kod)
+
     keccak = KeccakSponge(rate=1088, capacity=512, w=64, rounds=24)
     
     msg = b"krypto"
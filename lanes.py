@@ -0,0 +1,211 @@
+#Silnik "linii" (lane-packed): stan to 25 liczb całkowitych po w bitów zamiast 25*w osobnych bitów.
+#Indeks linii (x, y) to x + 5*y - ta sama kolejność, w jakiej bajty trafiają do stanu przy wchłanianiu.
+#Kroki odpowiadają algorytmom 1-6 z operations.py, ale działają na całych liniach naraz.
+
+from functools import lru_cache
+from operations import rc
+
+
+def _przesuniecia_rho():
+    #Przesunięcia (t+1)(t+2)/2 z algorytmu 2, przypisane do indeksów linii (jeszcze bez mod w)
+    r = [0] * 25
+    x, y = 1, 0
+    for t in range(24):
+        r[x + 5 * y] = ((t + 1) * (t + 2)) // 2
+        x, y = y, (2 * x + 3 * y) % 5
+    return r
+
+
+#Tablice niezależne od w - liczone raz przy imporcie
+PRZESUNIECIA_RHO = _przesuniecia_rho()
+#MAPA_PI[i] - z której linii pochodzi linia i po kroku Pi: A'[x][y] = A[(x + 3y) % 5][x]
+MAPA_PI = [(x + 3 * y) % 5 + 5 * x for y in range(5) for x in range(5)]
+
+
+def rotl(v, r, w, maska):
+    #Rotacja w lewo w obrębie w bitów (bit z przechodzi na pozycję z + r)
+    r %= w
+    if r == 0:
+        return v
+    return ((v << r) | (v >> (w - r))) & maska
+
+
+def theta_linie(A, w, maska):
+    C = [A[x] ^ A[x + 5] ^ A[x + 10] ^ A[x + 15] ^ A[x + 20] for x in range(5)]
+    D = [C[(x - 1) % 5] ^ rotl(C[(x + 1) % 5], 1, w, maska) for x in range(5)]
+    return [A[i] ^ D[i % 5] for i in range(25)]
+
+
+def rho_linie(A, w, maska):
+    return [rotl(A[i], PRZESUNIECIA_RHO[i], w, maska) for i in range(25)]
+
+
+def pi_linie(A):
+    return [A[MAPA_PI[i]] for i in range(25)]
+
+
+def chi_linie(A):
+    return [A[i] ^ (~A[(i + 1) % 5 + i - i % 5] & A[(i + 2) % 5 + i - i % 5]) for i in range(25)]
+
+
+def stala_rundy(ir, w):
+    #RC z algorytmu 6 złożone w jedną liczbę (bity na pozycjach 2^j - 1)
+    RC = 0
+    for j in range(int(w).bit_length()):
+        RC |= rc(j + 7 * ir) << (2**j - 1)
+    return RC
+
+
+def iota_linie(A, RC):
+    #RC - gotowa stała rundy z stala_rundy (liczenie LFSR w każdej rundzie byłoby najdroższym krokiem)
+    A_prime = list(A)
+    A_prime[0] ^= RC
+    return A_prime
+
+
+class PlanPermutacji:
+    """
+    Wszystko, co da się policzyć raz dla danej pary (w, rounds): stałe rund,
+    przesunięcia rho (już mod w), mapa pi oraz rozwinięta w linię prostą funkcja
+    keccak_f(linie) -> linie, zbudowana jako kod źródłowy i skompilowana przez compile().
+    Plany pobiera się przez plan_permutacji(w, rounds), które trzyma je w ograniczonym LRU.
+    """
+    def __init__(self, w, rounds):
+        self.w = w
+        self.rounds = rounds
+        self.maska = (1 << w) - 1
+        self.stale_rund = [stala_rundy(ir, w) for ir in range(rounds)]
+        self.przesuniecia_rho = [r % w for r in PRZESUNIECIA_RHO]
+        self.mapa_pi = MAPA_PI
+        self.zrodlo = self._generuj_zrodlo()
+        przestrzen = {}
+        exec(compile(self.zrodlo, f"<keccak_f w={w} rounds={rounds}>", "exec"), przestrzen)
+        self.keccak_f = przestrzen["keccak_f"]
+
+    def _rotl(self, wyr, r):
+        if r == 0:
+            return wyr
+        return f"((({wyr} << {r}) | ({wyr} >> {self.w - r})) & {self.maska})"
+
+    def _generuj_zrodlo(self):
+        a = [f"a{i}" for i in range(25)]
+        linie = ["def keccak_f(A):", f"    {', '.join(a)} = A"]
+        for RC in self.stale_rund:
+            #Theta: parzystości kolumn i poprawki D
+            for x in range(5):
+                linie.append(f"    c{x} = a{x} ^ a{x + 5} ^ a{x + 10} ^ a{x + 15} ^ a{x + 20}")
+            for x in range(5):
+                linie.append(f"    d{x} = c{(x - 1) % 5} ^ {self._rotl(f'c{(x + 1) % 5}', 1 % self.w)}")
+            #Theta + Rho + Pi złożone w jedno przypisanie na linię
+            for i in range(25):
+                src = self.mapa_pi[i]
+                linie.append(f"    b{i} = {self._rotl(f'(a{src} ^ d{src % 5})', self.przesuniecia_rho[src])}")
+            #Chi (+ Iota dla linii 0)
+            for i in range(25):
+                y5 = i - i % 5
+                expr = f"b{i} ^ (~b{(i + 1) % 5 + y5} & b{(i + 2) % 5 + y5})"
+                if i == 0 and RC:
+                    expr = f"{expr} ^ {RC}"
+                linie.append(f"    a{i} = {expr}")
+        linie.append(f"    return [{', '.join(a)}]")
+        return "\n".join(linie) + "\n"
+
+
+@lru_cache(maxsize=32)
+def plan_permutacji(w, rounds):
+    return PlanPermutacji(w, rounds)
+
+
+def stan_na_linie(A, w):
+    #Stan w formacie operations.py (A[x][y][z]) -> 25 linii
+    linie = []
+    for y in range(5):
+        for x in range(5):
+            val = 0
+            for z, bit in enumerate(A[x][y]):
+                if bit: val |= (1 << z)
+            linie.append(val)
+    return linie
+
+
+def linie_na_stan(linie, w):
+    return [[[(linie[x + 5 * y] >> z) & 1 for z in range(w)] for y in range(5)] for x in range(5)]
+
+
+def bajty_na_linie(block_bytes, w):
+    #Bajty bloku to ciąg bitów stanu (little-endian): linia i to bity [w*i, w*(i+1)).
+    #Dla w podzielnego przez 8 są to po prostu kolejne grupy w/8 bajtów, ale działa też dla w < 8.
+    val = int.from_bytes(block_bytes, 'little')
+    maska = (1 << w) - 1
+    n = min(25, -(-len(block_bytes) * 8 // w))
+    return [(val >> (w * i)) & maska for i in range(n)]
+
+
+def linie_na_bajty(linie, w, length):
+    val = 0
+    for i, lane in enumerate(linie):
+        val |= lane << (w * i)
+    return bytearray(val.to_bytes(-(-25 * w // 8), 'little')[:length])
+
+
+class WidokStanu:
+    """
+    Widok tylko do odczytu: state[x][y][z] zwraca bit z linii (x, y),
+    dzięki czemu callbacki i wizualizacje napisane pod listy 5x5xw działają bez zmian.
+    """
+    __slots__ = ('linie', 'w')
+
+    def __init__(self, linie, w):
+        self.linie = linie
+        self.w = w
+
+    def __len__(self):
+        return 5
+
+    def __getitem__(self, x):
+        if not -5 <= x < 5: raise IndexError(x)
+        return _WidokPlaszczyzny(self.linie, x % 5, self.w)
+
+    def __iter__(self):
+        return (self[x] for x in range(5))
+
+    def na_listy(self):
+        #Pełna kopia w formacie operations.py (A[x][y][z])
+        return linie_na_stan(self.linie, self.w)
+
+
+class _WidokPlaszczyzny:
+    __slots__ = ('linie', 'x', 'w')
+
+    def __init__(self, linie, x, w):
+        self.linie = linie
+        self.x = x
+        self.w = w
+
+    def __len__(self):
+        return 5
+
+    def __getitem__(self, y):
+        if not -5 <= y < 5: raise IndexError(y)
+        return _WidokLinii(self.linie[self.x + 5 * (y % 5)], self.w)
+
+    def __iter__(self):
+        return (self[y] for y in range(5))
+
+
+class _WidokLinii:
+    __slots__ = ('val', 'w')
+
+    def __init__(self, val, w):
+        self.val = val
+        self.w = w
+
+    def __len__(self):
+        return self.w
+
+    def __getitem__(self, z):
+        if not -self.w <= z < self.w: raise IndexError(z)
+        return (self.val >> (z % self.w)) & 1
+
+    def __iter__(self):
+        return ((self.val >> z) & 1 for z in range(self.w))
@@ -1,16 +1,31 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
+from tkinter import ttk, messagebox, filedialog
 import os
-import math
+import threading
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from collision import (birthday_attack, rho_attack, calculate_prob, wczytaj_punkt_kontrolny,
+                       TRYB_URODZINOWY, TRYB_WYROZNIONE)
+
+# Tryby ataku: (funkcja, liczba procesów - None oznacza wszystkie rdzenie, limit prób, tryb punktu kontrolnego)
+ATTACK_MODES = {
+    "Urodzinowy (tablica skrótów)": (birthday_attack, None, 1000000, TRYB_URODZINOWY),
+    # Punkty wyróżnione potrzebują co najmniej 2 procesów (1 proces to już tryb Brenta)
+    "Rho - punkty wyróżnione (bez pamięci)": (rho_attack, max(2, os.cpu_count() or 1), None, TRYB_WYROZNIONE),
+    "Rho - Brent (1 proces)": (rho_attack, 1, None, None),
+}
+CHECKPOINT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "keccak-wizualizacja", "atak.ckpt")
+CHECKPOINT_INTERVAL = 30.0  # s
+CLOSE_TIMEOUT = 20.0        # s - ile zamknięcie czeka na zapis końcowego punktu kontrolnego
 
 class AttackModule(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.pack(fill=tk.BOTH, expand=True)
         self.is_running = False
+        self.closing = False
+        self.stop_event = threading.Event()
+        self.worker = None
         self.create_widgets()
 
     def create_widgets(self):
@@ -43,8 +58,18 @@ class AttackModule(ttk.Frame):
         self.ent_out.insert(0, "2")
         self.ent_out.grid(row=0, column=7, padx=5, pady=5)
 
-        self.btn_start = ttk.Button(input_frame, text="URUCHOM ATAK", command=self.toggle_attack)
-        self.btn_start.pack(pady=(0, 10))
+        ttk.Label(params_grid, text="Tryb:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+        self.mode_var = tk.StringVar(value=next(iter(ATTACK_MODES)))
+        self.cmb_mode = ttk.Combobox(params_grid, textvariable=self.mode_var, values=list(ATTACK_MODES),
+                                     state="readonly", width=38)
+        self.cmb_mode.grid(row=1, column=1, columnspan=5, padx=5, pady=5, sticky="w")
+
+        btn_frame = ttk.Frame(input_frame)
+        btn_frame.pack(pady=(0, 10))
+        self.btn_start = ttk.Button(btn_frame, text="URUCHOM ATAK", command=self.toggle_attack)
+        self.btn_start.pack(side=tk.LEFT, padx=5)
+        self.btn_resume = ttk.Button(btn_frame, text="WZNÓW Z PLIKU", command=self.resume_attack)
+        self.btn_resume.pack(side=tk.LEFT, padx=5)
 
         info_frame = ttk.Frame(main_container)
         info_frame.pack(fill=tk.X, padx=5)
@@ -83,13 +108,12 @@ class AttackModule(ttk.Frame):
         self.txt_logs.config(state='disabled')
 
     def calculate_prob(self, attempts, hash_bytes):
-        N = 2**(hash_bytes * 8)
-        if attempts > N: return 100.0
-        return (1 - math.exp(-(attempts**2) / (2 * N))) * 100
+        return calculate_prob(attempts, hash_bytes)
 
     def toggle_attack(self):
         if self.is_running:
             self.is_running = False
+            self.stop_event.set()
             return
 
         try:
@@ -97,62 +121,97 @@ class AttackModule(ttk.Frame):
                 "w": int(self.ent_w.get()),
                 "rounds": int(self.ent_rounds.get()),
                 "in_size": int(self.ent_in.get()),
-                "out_size": int(self.ent_out.get())
+                "out_size": int(self.ent_out.get()),
+                "mode": self.mode_var.get()
             }
         except ValueError:
             messagebox.showerror("Błąd", "Nieprawidłowe parametry wejściowe.")
             return
+        self.start_attack(config)
+
+    def resume_attack(self):
+        if self.is_running:
+            return
+        path = filedialog.askopenfilename(
+            title="Wybierz punkt kontrolny",
+            initialdir=os.path.dirname(CHECKPOINT_PATH),
+            filetypes=[("Punkty kontrolne", "*.ckpt"), ("Wszystkie pliki", "*.*")]
+        )
+        if not path: return
+        try:
+            checkpoint = wczytaj_punkt_kontrolny(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Błąd", f"Nie udało się wczytać punktu kontrolnego:\n{e}")
+            return
 
+        # Parametry i tryb ataku pochodzą z pliku
+        for entry, key in ((self.ent_w, "w"), (self.ent_rounds, "rounds"), (self.ent_in, "in_size"), (self.ent_out, "out_size")):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(checkpoint.cfg[key]))
+        mode = next(name for name, m in ATTACK_MODES.items() if m[3] == checkpoint.tryb)
+        self.mode_var.set(mode)
+        config = dict(checkpoint.cfg, mode=mode, checkpoint_path=path)
+        self.start_attack(config, checkpoint)
+
+    def start_attack(self, config, resume=None):
         self.is_running = True
+        self.stop_event = threading.Event()
         self.btn_start.config(text="STOP")
+        self.btn_resume.config(state="disabled")
         self.lbl_status.config(text="Status: Praca...", foreground="orange")
         self.txt_logs.config(state='normal'); self.txt_logs.delete('1.0', tk.END); self.txt_logs.config(state='disabled')
         self.reset_plot()
-        
-        threading.Thread(target=self.attack_worker, args=(config,), daemon=True).start()
+        if resume is not None:
+            self.log(f"Wznowiono od {resume.proby} prób")
 
-    def attack_worker(self, cfg):
-        try:
-            from main import KeccakSponge
-        except ImportError:
-            from keccak import KeccakSponge
+        self.worker = threading.Thread(target=self.attack_worker, args=(config, self.stop_event, resume), daemon=True)
+        self.worker.start()
 
-        seen_hashes = {}
-        attempts = 0
+    def attack_worker(self, cfg, stop_event, resume=None):
+        # Liczą procesy z collision.py; ten wątek tylko czeka na zagregowany postęp i przekazuje go do Tk
         x_data, y_data = [], []
-        
-        total_bits = 25 * cfg['w']
-        rate = total_bits - (512 if total_bits > 512 else 64)
-        cap = total_bits - rate
-
-        while self.is_running:
-            attempts += 1
-            
-            rand_input = os.urandom(cfg['in_size'])
-            
-            k = KeccakSponge(rate, cap, cfg['w'], cfg['rounds'])
-            k.wchlanianie(rand_input)
-            digest = k.wyciskanie(cfg['out_size'])
-            
-            if digest in seen_hashes:
-                if seen_hashes[digest] != rand_input:
-                    prob = self.calculate_prob(attempts, cfg['out_size'])
-                    self.after(0, self.finish_attack, rand_input, seen_hashes[digest], digest, attempts, prob)
-                    return
-            
-            seen_hashes[digest] = rand_input
-
-            if attempts % 200 == 0 or attempts == 1:
-                p = self.calculate_prob(attempts, cfg['out_size'])
-                x_data.append(attempts)
-                y_data.append(p)
-                self.after(0, self.update_view, attempts, x_data, y_data)
-
-            if attempts > 1000000:
-                self.after(0, lambda: messagebox.showwarning("Przerwano", "Przekroczono limit prób."))
-                break
-
-        self.after(0, self.reset_ui)
+
+        def on_progress(attempts):
+            x_data.append(attempts)
+            y_data.append(calculate_prob(attempts, cfg['out_size']))
+            self.deliver(self.update_view, attempts, list(x_data), list(y_data))
+
+        attack, processes, limit, checkpoint_mode = ATTACK_MODES[cfg['mode']]
+        if limit is not None and resume is not None:
+            limit += resume.proby   # limit dotyczy prób w tym uruchomieniu
+        # Stan zapisywany co CHECKPOINT_INTERVAL s i przy zatrzymaniu (Brent nie ma czego zapisać)
+        checkpoint = {}
+        if checkpoint_mode is not None:
+            checkpoint = {"plik_kontrolny": cfg.get("checkpoint_path", CHECKPOINT_PATH),
+                          "co_ile": CHECKPOINT_INTERVAL, "wznowienie": resume}
+        try:
+            result = attack(cfg['w'], cfg['rounds'], cfg['in_size'], cfg['out_size'], procesy=processes,
+                            limit=limit, stop=stop_event, on_progress=on_progress, **checkpoint)
+        except Exception as e:
+            msg = str(e)  # e znika po wyjściu z bloku except, a callback wykona się później
+            self.deliver(messagebox.showerror, "Błąd", f"Atak przerwany: {msg}")
+            self.deliver(self.reset_ui)
+            return
+
+        if result.kolizja:
+            prob = calculate_prob(result.proby, cfg['out_size'])
+            self.deliver(self.finish_attack, result.m1, result.m2, result.digest, result.proby, prob)
+        elif result.powod == "limit":
+            self.deliver(messagebox.showwarning, "Przerwano", "Przekroczono limit prób.")
+            self.deliver(self.reset_ui)
+        else:
+            if checkpoint:
+                self.deliver(self.log, f"Punkt kontrolny: {checkpoint['plik_kontrolny']}")
+            self.deliver(self.reset_ui)
+
+    def deliver(self, callback, *args):
+        # Wywoływane z wątku ataku - do Tk wracamy przez after()
+        if self.closing:
+            return  # destroy() czeka na wątek, więc after() i tak nie zostałoby obsłużone
+        try:
+            self.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass    # moduł został zamknięty w trakcie ataku
 
     def update_view(self, att, x, y):
         self.lbl_attempts.config(text=f"Próby: {att}")
@@ -173,5 +232,17 @@ class AttackModule(ttk.Frame):
     def reset_ui(self):
         self.is_running = False
         self.btn_start.config(text="URUCHOM ATAK")
+        self.btn_resume.config(state="normal")
         if "ZAKOŃCZONO" not in self.lbl_status.cget("text"):
-            self.lbl_status.config(text="Status: Przerwano", foreground="red")
\ No newline at end of file
+            self.lbl_status.config(text="Status: Przerwano", foreground="red")
+
+    def destroy(self):
+        # Zamknięcie modułu (także okna - Tk.destroy niszczy moduły) kończy procesy robocze ataku
+        # i czeka, aż wątek zapisze końcowy punkt kontrolny - wątek jest daemon, więc inaczej
+        # interpreter skończyłby się przed zapisem
+        self.is_running = False
+        self.closing = True
+        self.stop_event.set()
+        if self.worker is not None:
+            self.worker.join(timeout=CLOSE_TIMEOUT)
+        super().destroy()
@@ -1,18 +1,92 @@
+import os
+import sqlite3
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from keccak import KeccakSponge
+from sac import sac_statistics
+from avalanche_cache import AvalancheCache
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
 
+# ================== KECCAK ==================
+# Funkcje na poziomie modułu, żeby pula procesów mogła je wywołać (metody okna Tk nie dają się zserializować)
+def calculate_hamming_diff(s1, s2, w):
+    return sum(
+        1 for x in range(5)
+        for y in range(5)
+        for z in range(w)
+        if s1[x][y][z] != s2[x][y][z]
+    )
+
+
+def calculate_params(w):
+    bits = 25 * w
+    cap = 512 if 512 < bits else 8
+    return bits - cap, cap
+
+
+def run_simulation(rounds, w, msg):
+    rate, cap = calculate_params(w)
+    msg_bytes = msg.encode("utf-8", errors="ignore")
+
+    h = KeccakSponge(rate, cap, w, rounds)
+    h.wchlanianie(msg_bytes)
+    hexhash = h.wyciskanie(32).hex()
+
+    s1 = KeccakSponge(rate, cap, w, rounds)
+    s2 = KeccakSponge(rate, cap, w, rounds)
+
+    m1 = bytearray(msg_bytes)
+    m2 = bytearray(msg_bytes or b"\x00")
+    m2[-1] ^= 1
+
+    s1.xorowanie_do_stanu(m1)
+    s2.xorowanie_do_stanu(m2)
+
+    dist = [calculate_hamming_diff(s1.state, s2.state, w)]
+
+    for r in range(rounds):
+        s1.wykonaj_pojedyncza_runde(r)
+        s2.wykonaj_pojedyncza_runde(r)
+        dist.append(calculate_hamming_diff(s1.state, s2.state, w))
+
+    return dist, 25 * w, hexhash
+
+
+ENGINE_VERSION = 1      # część klucza trwałej pamięci podręcznej - podbić przy zmianie run_simulation
+
+SAC_PAIRS = 1 << 17     # ile par (wiadomość, odwrócony bit) na wiersz w trybie statystycznym
+SAC_MIN_SAMPLES = 100
+
+
+def run_sac_simulation(rounds, w, msg):
+    # Losowe wiadomości tej samej długości co wpisana (co najmniej 1 bajt), odwracany każdy bit
+    length = max(1, len(msg.encode("utf-8", errors="ignore")))
+    samples = max(SAC_MIN_SAMPLES, SAC_PAIRS // min(8 * length, 25 * w))
+    return sac_statistics(rounds, w, length, probki=samples)
+
+
 class AvalancheModule(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.pack(fill=tk.BOTH, expand=True)
 
         self.results_cache = {}
+        self.sac_cache = {}         # indeks wiersza -> WynikSAC z trybu statystycznego
+        try:
+            self.disk_cache = AvalancheCache()  # wyniki run_simulation zapamiętane między uruchomieniami
+        except (OSError, sqlite3.Error) as e:
+            print(f"Błąd: pamięć podręczna wyników niedostępna ({e})")
+            self.disk_cache = None
         self.base_fontsize = 10
+        self.pool = None            # pula procesów, tworzona przy pierwszym przeliczeniu
+        self.futures = {}           # indeks wiersza -> zadanie w puli
+        self.calc_generation = 0    # wyniki ze starszych (anulowanych) przeliczeń są ignorowane
         self.create_widgets()
 
     # ================== UI ==================
@@ -41,7 +115,7 @@ class AvalancheModule(ttk.Frame):
 
         headers = [
             "Pokaż", "Kolor", "Rundy", "Szer",
-            "Wiadomość (Input)", "Wynik (Hash)"
+            "Wiadomość (Input)", "Wynik (Hash)", "Postęp"
         ]
 
         for c, h in enumerate(headers):
@@ -92,6 +166,9 @@ class AvalancheModule(ttk.Frame):
             e_h = ttk.Entry(input_frame, width=50, state="readonly")
             e_h.grid(row=row, column=5, sticky="ew")
 
+            progress = ttk.Progressbar(input_frame, length=60, maximum=100)
+            progress.grid(row=row, column=6, padx=2)
+
             self.entries.append({
                 "index": i,
                 "color": color,
@@ -99,6 +176,7 @@ class AvalancheModule(ttk.Frame):
                 "w": e_w,
                 "msg": e_m,
                 "hash_out": e_h,
+                "progress": progress,
                 "visible": visible,
                 "chk_btn": cb # przechowujemy referencje do checkboxa
             })
@@ -121,12 +199,38 @@ class AvalancheModule(ttk.Frame):
         ttk.Button(scen_frame, text="SCENARIUSZ 3\n(Odpornosc na wzorce)", width=25,
                    command=lambda: self.load_scenario(3)).pack(side=tk.LEFT, padx=5, pady=5)
 
-        # Główny przycisk
-        ttk.Button(
-            ctrl_frame,
+        # Główny przycisk + anulowanie
+        run_frame = ttk.Frame(ctrl_frame)
+        run_frame.pack(side=tk.TOP, fill=tk.X, padx=50, pady=(5, 0))
+
+        self.calc_btn = ttk.Button(
+            run_frame,
             text="PRZELICZ (Generuj Wykres)",
             command=self.calculate_all_data
-        ).pack(side=tk.TOP, fill=tk.X, padx=50, pady=(5, 0))
+        )
+        self.calc_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        self.cancel_btn = ttk.Button(
+            run_frame,
+            text="ANULUJ",
+            command=self.cancel_calculation,
+            state="disabled"
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
+
+        self.stats_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            run_frame,
+            text="Tryb statystyczny (SAC)",
+            variable=self.stats_mode,
+            command=self.update_plot_view
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        ttk.Button(
+            run_frame,
+            text="MACIERZ SAC",
+            command=self.show_sac_matrices
+        ).pack(side=tk.LEFT, padx=(5, 0))
 
         # ---------- PLOT ----------
         self.plot_frame = ttk.Frame(main_container)
@@ -151,6 +255,7 @@ class AvalancheModule(ttk.Frame):
 
     # ================== SCENARIOS ==================
     def load_scenario(self, scen_id):
+        self.cancel_calculation()
         data = []
         
         if scen_id == 1:
@@ -208,6 +313,7 @@ class AvalancheModule(ttk.Frame):
                 entry["hash_out"].config(state="normal")
                 entry["hash_out"].delete(0, tk.END)
                 entry["hash_out"].config(state="readonly")
+                entry["progress"].config(value=0)
         
         # Wyczyść wykres po zmianie danych (wymaga ponownego przeliczenia)
         self.ax.clear()
@@ -253,89 +359,157 @@ class AvalancheModule(ttk.Frame):
             for t in self.ax.get_legend().get_texts():
                 t.set_fontsize(fs)
 
-    # ================== KECCAK ==================
-    def calculate_hamming_diff(self, s1, s2, w):
-        return sum(
-            1 for x in range(5)
-            for y in range(5)
-            for z in range(w)
-            if s1[x][y][z] != s2[x][y][z]
-        )
-
-    def calculate_params(self, w):
-        bits = 25 * w
-        cap = 512 if 512 < bits else 8
-        return bits - cap, cap
-
-    def run_simulation(self, rounds, w, msg):
-        rate, cap = self.calculate_params(w)
-        msg_bytes = msg.encode("utf-8", errors="ignore")
-
-        h = KeccakSponge(rate, cap, w, rounds)
-        h.wchlanianie(msg_bytes)
-        hexhash = h.wyciskanie(32).hex()
-
-        s1 = KeccakSponge(rate, cap, w, rounds)
-        s2 = KeccakSponge(rate, cap, w, rounds)
-
-        m1 = bytearray(msg_bytes)
-        m2 = bytearray(msg_bytes or b"\x00")
-        m2[-1] ^= 1
-
-        s1.xorowanie_do_stanu(m1)
-        s2.xorowanie_do_stanu(m2)
-
-        dist = [self.calculate_hamming_diff(s1.state, s2.state, w)]
-
-        for r in range(rounds):
-            s1.wykonaj_pojedyncza_runde(r)
-            s2.wykonaj_pojedyncza_runde(r)
-            dist.append(self.calculate_hamming_diff(s1.state, s2.state, w))
-
-        return dist, 25 * w, hexhash
-
     # ================== CALC ==================
+    def set_hash_text(self, e, text):
+        e["hash_out"].config(state="normal")
+        e["hash_out"].delete(0, tk.END)
+        e["hash_out"].insert(0, text)
+        e["hash_out"].config(state="readonly")
+
+    def set_row_progress(self, e, running):
+        bar = e["progress"]
+        bar.stop()
+        if running:
+            bar.config(mode="indeterminate")
+            bar.start(15)
+        else:
+            bar.config(mode="determinate", value=100)
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=min(len(self.entries), os.cpu_count() or 1))
+        return self.pool
+
     def calculate_all_data(self):
-        self.results_cache.clear()
-        self.winfo_toplevel().config(cursor="wait")
-        self.winfo_toplevel().update_idletasks()
+        # Każdy wiersz to osobne zadanie w puli procesów - czas całości to mniej więcej czas najwolniejszego wiersza
+        self.cancel_calculation()
+        stats = self.stats_mode.get()
+        cache = self.sac_cache if stats else self.results_cache
+        cache.clear()
 
         for e in self.entries:
+            e["progress"].config(mode="determinate", value=0)
+            if not e["visible"].get():
+                continue
             try:
-                if not e["visible"].get():
-                    continue
-
                 r = int(e["rounds"].get())
                 w = int(e["w"].get())
                 msg = e["msg"].get()
-
-                dist, bits, h = self.run_simulation(r, w, msg)
+            except ValueError:
+                self.set_hash_text(e, "BŁĄD PARMETRÓW")
+                continue
+
+            # Wiersz policzony już kiedyś z tymi samymi parametrami bierzemy z dysku
+            params = (r, w, msg.encode("utf-8", errors="ignore"), ENGINE_VERSION)
+            cached = None if stats or self.disk_cache is None else self.disk_cache.get(*params)
+            if cached is not None:
+                dist, bits, h = cached
                 self.results_cache[e["index"]] = (dist, bits)
+                self.set_hash_text(e, h)
+                self.set_row_progress(e, False)
+                continue
+
+            self.set_hash_text(e, "liczenie...")
+            self.set_row_progress(e, True)
+            future = self.get_pool().submit(run_sac_simulation if stats else run_simulation, r, w, msg)
+            self.futures[e["index"]] = future
+            future.add_done_callback(
+                lambda f, idx=e["index"], gen=self.calc_generation, params=params:
+                    self.deliver(self.on_row_done, gen, idx, stats, params, f)
+            )
 
-                e["hash_out"].config(state="normal")
-                e["hash_out"].delete(0, tk.END)
-                e["hash_out"].insert(0, h)
-                e["hash_out"].config(state="readonly")
-            except Exception:
-                # W przypadku błędu (np. zbyt małe w dla biblioteki) czyścimy pole
-                e["hash_out"].config(state="normal")
-                e["hash_out"].delete(0, tk.END)
-                e["hash_out"].insert(0, "BŁĄD PARMETRÓW")
-                e["hash_out"].config(state="readonly")
-
-        self.winfo_toplevel().config(cursor="")
+        if self.futures:
+            self.calc_btn.config(state="disabled")
+            self.cancel_btn.config(state="normal")
         self.update_plot_view()
 
+    def deliver(self, callback, *args):
+        # Wywoływane z wątku puli - do Tk wracamy przez after()
+        try:
+            self.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass    # moduł został zamknięty w trakcie liczenia
+
+    def on_row_done(self, generation, idx, stats, params, future):
+        if generation != self.calc_generation or future.cancelled():
+            return
+        self.futures.pop(idx, None)
+        e = self.entries[idx]
+        self.set_row_progress(e, False)
+        try:
+            if stats:
+                result = future.result()
+                self.sac_cache[idx] = result
+                self.set_hash_text(e, f"SAC: {result.pary} par, max|P - 0.5| = {result.odchylenie_sac():.4f}")
+            else:
+                dist, bits, h = future.result()
+                self.results_cache[idx] = (dist, bits)
+                self.set_hash_text(e, h)
+                if self.disk_cache is not None:
+                    try:
+                        self.disk_cache.put(*params, dist, bits, h)
+                    except sqlite3.Error as err:
+                        print(f"Błąd zapisu pamięci podręcznej: {err}")
+        except ValueError as err:
+            # Tryb SAC podaje konkretny powód (np. nieobsługiwane w)
+            e["progress"].config(value=0)
+            self.set_hash_text(e, str(err) if stats else "BŁĄD PARMETRÓW")
+        except Exception:
+            # W przypadku błędu (np. zbyt małe w dla biblioteki) czyścimy pole
+            e["progress"].config(value=0)
+            self.set_hash_text(e, "BŁĄD PARMETRÓW")
+
+        if not self.futures:
+            self.calc_btn.config(state="normal")
+            self.cancel_btn.config(state="disabled")
+        self.update_plot_view()
+
+    def cancel_calculation(self):
+        self.calc_generation += 1
+        if not self.futures:
+            return
+        for idx, future in self.futures.items():
+            future.cancel()
+            e = self.entries[idx]
+            self.set_row_progress(e, False)
+            e["progress"].config(value=0)
+            self.set_hash_text(e, "ANULOWANO")
+        self.futures.clear()
+        # Wiersze już liczone w procesach nie dają się przerwać - zamykamy pulę bez czekania,
+        # procesy skończą bieżące zadanie i wyjdą, a następne przeliczenie dostanie nową pulę
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.calc_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+
+    def destroy(self):
+        self.cancel_calculation()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+        super().destroy()
+
     # ================== PLOT ==================
     def update_plot_view(self):
         self.ax.clear()
         self.ax_zoom.clear()
 
+        stats = self.stats_mode.get()
+        cache = self.sac_cache if stats else self.results_cache
+
         for e in self.entries:
             idx = e["index"]
-            if idx in self.results_cache and e["visible"].get():
-                dist, bits = self.results_cache[idx]
-                perc = [d / bits * 100 for d in dist]
+            if idx in cache and e["visible"].get():
+                if stats:
+                    result = cache[idx]
+                    perc = result.srednia / result.bits * 100
+                else:
+                    dist, bits = cache[idx]
+                    perc = [d / bits * 100 for d in dist]
                 x = range(len(perc))
 
                 label_text = f"R={e['rounds'].get()}, w={e['w'].get()}"
@@ -348,8 +522,16 @@ class AvalancheModule(ttk.Frame):
                 self.ax.plot(x, perc, marker='o', color=e["color"], label=label_text)
                 self.ax_zoom.plot(x, perc, marker='o', color=e["color"])
 
+                if stats:
+                    # Jasne pasmo: średnia ± odchylenie standardowe, ciemne: 95% przedział ufności średniej
+                    spread = np.sqrt(result.wariancja) / result.bits * 100
+                    low, high = result.przedzial_ufnosci()
+                    for ax in (self.ax, self.ax_zoom):
+                        ax.fill_between(x, perc - spread, perc + spread, color=e["color"], alpha=0.1)
+                        ax.fill_between(x, low / result.bits * 100, high / result.bits * 100, color=e["color"], alpha=0.35)
+
         # main axis
-        self.ax.set_title("Efekt Lawinowy")
+        self.ax.set_title("Efekt Lawinowy (średnia po próbkach, SAC)" if stats else "Efekt Lawinowy")
         self.ax.set_xlabel("Numer rundy")
         self.ax.set_ylabel("% zmian")
         self.ax.set_ylim(0, 65) 
@@ -363,4 +545,29 @@ class AvalancheModule(ttk.Frame):
         self.ax_zoom.set_title("Zoom 40–60%", fontsize=8)
         self.ax_zoom.grid(True, linestyle=":", alpha=0.5)
 
-        self.canvas.draw_idle()
\ No newline at end of file
+        self.canvas.draw_idle()
+
+    def show_sac_matrices(self):
+        # Osobne okno: macierz SAC (bit wejścia x bit wyjścia) dla każdego widocznego wiersza
+        rows = [e for e in self.entries if e["index"] in self.sac_cache and e["visible"].get()]
+        if not rows:
+            messagebox.showinfo("Macierz SAC", "Najpierw przelicz wykres w trybie statystycznym (SAC).")
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Macierz SAC - prawdopodobieństwo zmiany bitu wyjścia")
+        cols = min(3, len(rows))
+        fig = Figure(figsize=(4 * cols, 3.2 * -(-len(rows) // cols)), dpi=100)
+        for k, e in enumerate(rows):
+            result = self.sac_cache[e["index"]]
+            ax = fig.add_subplot(-(-len(rows) // cols), cols, k + 1)
+            im = ax.imshow(result.macierz, aspect="auto", cmap="coolwarm", vmin=0, vmax=1, interpolation="nearest")
+            ax.set_title(f"R={e['rounds'].get()}, w={e['w'].get()}", color=e["color"], fontsize=9)
+            ax.set_xlabel("bit wyjścia", fontsize=8)
+            ax.set_ylabel("bit wejścia", fontsize=8)
+            fig.colorbar(im, ax=ax)
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, win)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw()
@@ -1,15 +1,144 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
 import os
 import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, CancelledError, as_completed, wait
+from multiprocessing import shared_memory
+import numpy as np
 
 # Upewniamy się, że importujemy Twój moduł keccak
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from keccak import KeccakSponge
+    import batched
 except ImportError:
-    print("Błąd: Nie znaleziono pliku keccak.py lub operations.py")
+    print("Błąd: Nie znaleziono pliku batched.py, lanes.py lub operations.py")
+
+W = 8
+BLOCK_SIZE = 25
+ROUNDS = 10
+DEBOUNCE_MS = 120   # przerwa w pisaniu, po której startuje przeliczenie
+MAX_IMAGE_SIZE = (3840, 2160)           # większe obrazy są zmniejszane przy wczytaniu (4K)
+SMALL_IMAGE_BYTES = 1 << 20             # do tej wielkości liczymy od razu wszystkie kroki w jednym wątku
+TILE_BYTES = BLOCK_SIZE * 8192          # kafelek = 8192 bloków 25-bajtowych (~200 KB)
+CACHE_BYTES = 256 << 20                 # limit pamięci na gotowe obrazy kroków
+PREVIEW_INTERVAL = 0.1                  # co ile sekund odświeżać podgląd w trakcie liczenia kafelków
+
+
+def _initial_states(img_bytes, key_bytes, w):
+    # Wszystkie bloki 25-bajtowe naraz: jeden stan na blok (ostatni dopełniony zerami)
+    n_blocks = -(-len(img_bytes) // BLOCK_SIZE)
+    blocks = np.zeros(n_blocks * BLOCK_SIZE, dtype=np.uint8)
+    blocks[:len(img_bytes)] = np.frombuffer(img_bytes, dtype=np.uint8)
+    blocks = blocks.reshape(n_blocks, BLOCK_SIZE)
+
+    A = batched.nowe_stany(n_blocks, w)
+    if key_bytes:
+        key_block = np.frombuffer((key_bytes * 10)[:BLOCK_SIZE], dtype=np.uint8)
+        A = batched.xor_blocks(A, np.tile(key_block, (n_blocks, 1)), w)
+    return batched.xor_blocks(A, blocks, w)
+
+
+def compute_step_images(img_bytes, key_bytes, w=W, rounds=ROUNDS, cancel=None):
+    """
+    Jedno przejście wszystkich bloków przez całą permutację. Zwraca tablicę
+    (5 * rounds + 1, len(img_bytes)): wiersz k to obraz po k krokach (0 - sam XOR z kluczem).
+    cancel - opcjonalny threading.Event; sprawdzany po każdym kroku, ustawiony -> zwraca None.
+    """
+    A = _initial_states(img_bytes, key_bytes, w)
+    steps = np.empty((5 * rounds + 1, len(img_bytes)), dtype=np.uint8)
+    steps[0] = batched.linie_na_bajty(A, w, BLOCK_SIZE).reshape(-1)[:len(img_bytes)]
+    for i, (_, _, A) in enumerate(batched.permute_steps(A, w, rounds), start=1):
+        if cancel is not None and cancel.is_set():
+            return None
+        steps[i] = batched.linie_na_bajty(A, w, BLOCK_SIZE).reshape(-1)[:len(img_bytes)]
+    return steps
+
+
+def compute_step_image(img_bytes, key_bytes, steps, w=W, rounds=ROUNDS):
+    """Obraz po `steps` krokach (bez pośrednich) - dla dużych obrazów, gdzie cały stos kroków nie zmieści się w pamięci."""
+    A = batched.permute(_initial_states(img_bytes, key_bytes, w), w, rounds, kroki=steps)
+    return batched.linie_na_bajty(A, w, BLOCK_SIZE).reshape(-1)[:len(img_bytes)]
+
+
+def process_tile(shm_in_name, shm_out_name, start, end, key_bytes, steps):
+    """
+    Zadanie dla puli procesów: bloki z bajtów [start, end) wspólnego bufora wejściowego
+    przechodzą `steps` kroków, wynik trafia w to samo miejsce bufora wyjściowego.
+    Granice kafelków są wielokrotnościami BLOCK_SIZE, więc podział nie zmienia wyniku.
+    """
+    shm_in = shared_memory.SharedMemory(name=shm_in_name)
+    shm_out = shared_memory.SharedMemory(name=shm_out_name)
+    try:
+        out = compute_step_image(bytes(shm_in.buf[start:end]), key_bytes, steps)
+        shm_out.buf[start:end] = out.tobytes()
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return start, end
+
+
+def compute_tiled(pool, img_bytes, key_bytes, steps, cancel=None, on_progress=None):
+    """
+    Obraz po `steps` krokach liczony kafelkami w puli procesów. Piksele trafiają do pamięci
+    współdzielonej (bez kopiowania do każdego zadania). on_progress(bufor, gotowe, wszystkie)
+    dostaje co PREVIEW_INTERVAL migawkę bufora wyjściowego: policzone kafelki są już
+    zaszyfrowane, reszta to jeszcze obraz źródłowy. Zwraca bytes albo None po anulowaniu.
+    """
+    n = len(img_bytes)
+    shm_in = shared_memory.SharedMemory(create=True, size=n)
+    shm_out = shared_memory.SharedMemory(create=True, size=n)
+    try:
+        shm_in.buf[:n] = img_bytes
+        shm_out.buf[:n] = img_bytes
+        futures = [pool.submit(process_tile, shm_in.name, shm_out.name, s, min(s + TILE_BYTES, n), key_bytes, steps)
+                   for s in range(0, n, TILE_BYTES)]
+        last_preview = time.monotonic()
+        for done, future in enumerate(as_completed(futures), start=1):
+            if cancel is not None and cancel.is_set():
+                for f in futures:
+                    f.cancel()
+                wait(futures)   # trwające kafelki muszą skończyć, zanim zwolnimy pamięć
+                return None
+            future.result()
+            if on_progress is not None and done < len(futures) and time.monotonic() - last_preview >= PREVIEW_INTERVAL:
+                last_preview = time.monotonic()
+                on_progress(bytes(shm_out.buf[:n]), done, len(futures))
+        return bytes(shm_out.buf[:n])
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+
+class StepCache:
+    """LRU: (skrót obrazu źródłowego, hasło, krok) -> obraz po tym kroku, ograniczone łączną liczbą bajtów."""
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        image = self.entries.get(key)
+        if image is not None:
+            self.entries.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= len(old)
+        self.entries[key] = image
+        self.total_bytes += len(image)
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
 
 class EncryptionModule(ttk.Frame):
     def __init__(self, parent):
@@ -19,9 +148,16 @@ class EncryptionModule(ttk.Frame):
         
         self.original_image_pil = None
         self.password_locked = False 
+        self.step_cache = StepCache()
+        self.render_generation = 0  # rośnie z każdym nowym zleceniem; renderujemy tylko najnowsze
+        self.debounce_id = None
+        self.cancel_event = None
+        self.pending_key = None     # (obraz, hasło[, krok]) czekające na debounce albo liczone w tle
+        self.pool = None            # pula procesów dla dużych obrazów, tworzona przy pierwszym użyciu
         
         # --- USTAWIENIA WIZUALIZACJI ---
         self.process_size = (100, 100) 
+        self.process_mode = "L"
         self.display_size = (500, 500)
         # -------------------------------
 
@@ -53,6 +189,10 @@ class EncryptionModule(ttk.Frame):
         self.lock_btn = ttk.Button(pass_frame, text="OK", width=4, command=self.lock_password)
         self.lock_btn.pack(side=tk.LEFT)
 
+        ttk.Button(pass_frame, text="Wczytaj obraz", command=self.load_image_file).pack(side=tk.LEFT, padx=(10, 0))
+        self.status_label = ttk.Label(pass_frame, text="", width=16)
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
         # 2. Suwak (Prawa)
         slider_frame = ttk.Frame(top_bar)
         slider_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
@@ -139,9 +279,39 @@ class EncryptionModule(ttk.Frame):
                     pixels[x, y] = 0
         self.load_image_object(img)
 
+    def load_image_file(self):
+        path = filedialog.askopenfilename(
+            title="Wybierz obraz",
+            filetypes=[("Obrazy", "*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff *.webp"), ("Wszystkie pliki", "*.*")]
+        )
+        if not path: return
+        try:
+            img = Image.open(path)
+            img.load()
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie udało się wczytać obrazu:\n{e}")
+            return
+        self.load_image_object(img)
+
+    def fit_to_display(self, size):
+        # Największy rozmiar w display_size z zachowaniem proporcji obrazu
+        scale = min(self.display_size[0] / size[0], self.display_size[1] / size[1])
+        return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
     def load_image_object(self, img_pil):
+        if img_pil.mode not in ("L", "RGB", "RGBA"):
+            img_pil = img_pil.convert("RGBA" if "A" in img_pil.getbands() else "RGB")
+        if img_pil.width > MAX_IMAGE_SIZE[0] or img_pil.height > MAX_IMAGE_SIZE[1]:
+            img_pil = img_pil.copy()
+            img_pil.thumbnail(MAX_IMAGE_SIZE)
+        self.cancel_pending()
         self.processing_source = img_pil
-        disp = self.processing_source.resize(self.display_size, Image.Resampling.NEAREST)
+        self.process_size = img_pil.size
+        self.process_mode = img_pil.mode
+        self.source_bytes = img_pil.tobytes()
+        header = f"{img_pil.mode}:{img_pil.width}x{img_pil.height}:".encode()
+        self.source_hash = hashlib.sha3_256(header + self.source_bytes).digest()
+        disp = self.processing_source.resize(self.fit_to_display(self.process_size), Image.Resampling.NEAREST)
         self.photo_orig = ImageTk.PhotoImage(disp)
         self.lbl_orig.config(image=self.photo_orig)
         self.step_var.set(0)
@@ -207,6 +377,9 @@ class EncryptionModule(ttk.Frame):
     def on_slider_release(self, event):
         self.process_image()
 
+    def is_small_image(self):
+        return len(self.source_bytes) <= SMALL_IMAGE_BYTES
+
     def process_image(self):
         if not hasattr(self, 'processing_source'): return
         
@@ -214,54 +387,122 @@ class EncryptionModule(ttk.Frame):
         password = self.pass_entry.get()
         
         if target_steps == 0 and not password:
+            self.cancel_pending()
             self.lbl_enc.config(image=self.photo_orig)
             return
 
-        w = 8 
-        block_size = 25 
-        k = KeccakSponge(rate=200, capacity=0, w=w, rounds=10)
-        
-        img_bytes = self.processing_source.tobytes()
-        key_bytes = password.encode('utf-8')
-        out_bytes = bytearray()
-        
-        class StopProcessing(Exception): pass
-        current_step_counter = 0
-        
-        def my_callback(name, state):
-            nonlocal current_step_counter
-            current_step_counter += 1
-            if current_step_counter >= target_steps:
-                raise StopProcessing
-
-        for i in range(0, len(img_bytes), block_size):
-            chunk = img_bytes[i : i + block_size]
-            k.state = [[[0] * w for _ in range(5)] for _ in range(5)]
-            
-            if key_bytes:
-                k.xorowanie_do_stanu((key_bytes * 10)[:block_size])
-
-            k.xorowanie_do_stanu(chunk)
-            
-            current_step_counter = 0
-            if target_steps > 0:
-                try:
-                    k.keccak_f(callback=my_callback)
-                except StopProcessing:
-                    pass 
-                except Exception: pass
-
-            processed = k.stan_na_bajty(block_size)
-            out_bytes.extend(processed[:len(chunk)])
+        # Suwak i strzałki tylko czytają gotowy obraz; małe obrazy liczone są od razu dla
+        # wszystkich kroków, duże - kafelkami tylko dla wybranego kroku
+        out_bytes = self.step_cache.get((self.source_hash, password, target_steps))
+        if out_bytes is None:
+            self.schedule_compute(password, target_steps)
+            return
+        self.cancel_pending()
+        self.show_result(out_bytes)
 
+    def show_result(self, out_bytes):
         try:
-            res_img = Image.frombytes("L", self.process_size, bytes(out_bytes))
-            disp_large = res_img.resize(self.display_size, Image.Resampling.NEAREST)
+            res_img = Image.frombytes(self.process_mode, self.process_size, out_bytes)
+            disp_large = res_img.resize(self.fit_to_display(self.process_size), Image.Resampling.NEAREST)
             self.photo_enc = ImageTk.PhotoImage(disp_large)
             self.lbl_enc.config(image=self.photo_enc)
         except Exception as e:
             print(f"Display error: {e}")
 
+    # ================== PRZELICZANIE W TLE ==================
+    def cancel_pending(self):
+        # Unieważnia odłożone i trwające zlecenia (wynik w locie zostanie tylko zapisany w cache)
+        self.render_generation += 1
+        if self.debounce_id is not None:
+            self.after_cancel(self.debounce_id)
+            self.debounce_id = None
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_event = None
+        self.pending_key = None
+        self.status_label.config(text="")
+
+    def schedule_compute(self, password, target_steps):
+        if self.is_small_image():
+            cache_key = (self.source_hash, password)
+        else:
+            cache_key = (self.source_hash, password, target_steps)
+        if cache_key == self.pending_key:
+            return  # to samo już się liczy - po zakończeniu pokażemy aktualny krok
+        self.cancel_pending()
+        self.pending_key = cache_key
+        self.status_label.config(text="Liczenie...")
+        self.debounce_id = self.after(DEBOUNCE_MS, self.start_compute, self.render_generation, password, target_steps)
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return self.pool
+
+    def start_compute(self, generation, password, target_steps):
+        self.debounce_id = None
+        self.cancel_event = threading.Event()
+        key_bytes = password.encode('utf-8')
+        if self.is_small_image():
+            target = self.compute_worker
+            args = (generation, (self.source_hash, password), self.source_bytes, key_bytes, self.cancel_event)
+        else:
+            target = self.tiled_worker
+            args = (generation, (self.source_hash, password, target_steps), self.get_pool(),
+                    self.source_bytes, key_bytes, target_steps, self.cancel_event)
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def deliver(self, callback, *args):
+        try:
+            self.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass    # moduł został zamknięty w trakcie liczenia
+
+    def compute_worker(self, generation, cache_key, img_bytes, key_bytes, cancel):
+        steps = compute_step_images(img_bytes, key_bytes, cancel=cancel)
+        if steps is None:
+            return
+        self.deliver(self.on_steps_ready, generation, cache_key, steps)
+
+    def tiled_worker(self, generation, cache_key, pool, img_bytes, key_bytes, target_steps, cancel):
+        def on_progress(partial, done, total):
+            self.deliver(self.on_partial_result, generation, partial, done, total)
+        try:
+            result = compute_tiled(pool, img_bytes, key_bytes, target_steps, cancel, on_progress)
+        except (RuntimeError, CancelledError):
+            return  # pula zamknięta razem z modułem
+        if result is None:
+            return
+        self.deliver(self.on_tile_result_ready, generation, cache_key, result)
+
+    def on_steps_ready(self, generation, cache_key, steps):
+        for i, step_image in enumerate(steps):
+            self.step_cache.put(cache_key + (i,), step_image.tobytes())
+        self.finish_compute(generation)
+
+    def on_tile_result_ready(self, generation, cache_key, result):
+        self.step_cache.put(cache_key, result)
+        self.finish_compute(generation)
+
+    def on_partial_result(self, generation, partial, done, total):
+        if generation == self.render_generation:
+            self.status_label.config(text=f"Kafelki: {done}/{total}")
+            self.show_result(partial)
+
+    def finish_compute(self, generation):
+        if generation == self.render_generation:
+            self.pending_key = None
+            self.status_label.config(text="")
+            # process_image czyta aktualne hasło i krok, więc pokaże najnowszy stan
+            self.process_image()
+
+    def destroy(self):
+        self.cancel_pending()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        super().destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Wizualizacja Keccak SHA-3")
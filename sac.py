@@ -0,0 +1,156 @@
+#Statystyczne kryterium lawinowe (SAC, Strict Avalanche Criterion).
+#Zamiast jednej wiadomości i jednego odwróconego bitu: wiele losowych wiadomości i odwrócenie
+#każdego bitu wejścia po kolei. Wszystkie stany (wiadomości i ich odmiany) idą przez silnik
+#wsadowy naraz, a odległość Hamminga to popcount z XOR-u linii - bez pętli po bitach.
+#Dla w > 64 (w podzielne przez 64) linia to k = w / 64 słów uint64 - stan (N, 25, k).
+
+from functools import lru_cache
+import numpy as np
+import batched
+from lanes import plan_permutacji, MAPA_PI
+
+
+class WynikSAC:
+    """
+    srednia[r], wariancja[r] - odległość Hamminga (w bitach) po r rundach (r = 0..rounds)
+    po wszystkich parach (wiadomość, wiadomość z odwróconym bitem);
+    macierz[i, j] - częstość zmiany bitu wyjścia j po odwróceniu bitu wejścia i (po ostatniej rundzie);
+    pary - liczba par w statystykach, bits - rozmiar stanu 25*w.
+    """
+    def __init__(self, srednia, wariancja, macierz, pary, bits):
+        self.srednia = srednia
+        self.wariancja = wariancja
+        self.macierz = macierz
+        self.pary = pary
+        self.bits = bits
+
+    def przedzial_ufnosci(self, z=1.96):
+        #Przedział ufności dla średniej (domyślnie 95%), w bitach
+        pol = z * np.sqrt(self.wariancja / self.pary)
+        return self.srednia - pol, self.srednia + pol
+
+    def odchylenie_sac(self):
+        #Największe odstępstwo od idealnego 0.5 w macierzy SAC
+        return float(np.max(np.abs(self.macierz - 0.5)))
+
+
+class _PlanSlow:
+    #Indeksy słów i przesunięcia dla linii podzielonych na k słów uint64 (słowo 0 najmłodsze):
+    #rotacja o r = 64q + b to słowa j - q i j - q - 1 złożone przesunięciami b i 64 - b
+    def __init__(self, w, rounds):
+        plan = plan_permutacji(w, rounds)
+        k = w // 64
+        j = np.arange(k)
+        zrodla = np.array(MAPA_PI)
+        r = np.array(plan.przesuniecia_rho)[zrodla]
+        self.k = k
+        self.zrodla = zrodla[:, None]                           #Rho + Pi: linia i pochodzi z linii MAPA_PI[i]
+        self.starsze = (j[None] - r[:, None] // 64) % k
+        self.mlodsze = (self.starsze - 1) % k
+        self.w_lewo = (r % 64).astype(np.uint64)[:, None]
+        self.w_prawo = ((64 - r % 64) % 64).astype(np.uint64)[:, None]
+        self.maska_mlodszych = np.where(r % 64 == 0, np.uint64(0), ~np.uint64(0))[:, None]
+        self.poprzednie = (j - 1) % k                           #rotacja o 1 bit w theta
+        maska = (1 << 64) - 1
+        self.stale_rund = [np.array([(RC >> (64 * i)) & maska for i in range(k)], dtype=np.uint64)
+                           for RC in plan.stale_rund]
+
+
+@lru_cache(maxsize=8)
+def _plan_slow(w, rounds):
+    return _PlanSlow(w, rounds)
+
+
+def _rundy_slow(A, w, rounds):
+    """Generator: stany (N, 25, k) po każdej rundzie Keccak-f, dla linii podzielonych na słowa."""
+    p = _plan_slow(w, rounds)
+    n = len(A)
+    nastepne, po_nastepnym = [1, 2, 3, 4, 0], [2, 3, 4, 0, 1]
+    for RC in p.stale_rund:
+        A5 = A.reshape(n, 5, 5, p.k)                    #[n, y, x, słowo]
+        C = np.bitwise_xor.reduce(A5, axis=1)           #[n, x, słowo]
+        C1 = C[:, nastepne]
+        D = C[:, [4, 0, 1, 2, 3]] ^ ((C1 << np.uint64(1)) | (C1[:, :, p.poprzednie] >> np.uint64(63)))
+        A = (A5 ^ D[:, None]).reshape(n, 25, p.k)
+        #Rho + Pi jednym indeksowaniem
+        B = (A[:, p.zrodla, p.starsze] << p.w_lewo) | ((A[:, p.zrodla, p.mlodsze] >> p.w_prawo) & p.maska_mlodszych)
+        #Chi + Iota
+        B5 = B.reshape(n, 5, 5, p.k)
+        A = (B5 ^ (~B5[:, :, nastepne] & B5[:, :, po_nastepnym])).reshape(n, 25, p.k)
+        A[:, 0] ^= RC
+        yield A
+
+
+def _silnik(w, rounds, bajty_stanu):
+    #(kształt linii, bajty -> stany, generator stanów po rundach, stany -> bajty)
+    if w <= 64:
+        def rundy(A):
+            for _, nazwa, A in batched.permute_steps(A, w, rounds):
+                if nazwa == "Iota":
+                    yield A
+        return ((25,), lambda dane: batched.bajty_na_linie(dane, w), rundy,
+                lambda A: batched.linie_na_bajty(A, w, bajty_stanu))
+    if w % 64:
+        raise ValueError(f"Błąd: SAC obsługuje w <= 64 albo wielokrotności 64 (podano w = {w})")
+    k = w // 64
+
+    def na_slowa(dane):
+        pelne = np.zeros((len(dane), bajty_stanu), dtype=np.uint8)
+        pelne[:, :dane.shape[1]] = dane[:, :bajty_stanu]
+        return pelne.view('<u8').astype(np.uint64).reshape(-1, 25, k)
+    return ((25, k), na_slowa, lambda A: _rundy_slow(A, w, rounds),
+            lambda A: np.ascontiguousarray(A.astype('<u8')).view(np.uint8).reshape(len(A), -1))
+
+
+def sac_statistics(rounds, w, dlugosc_wejscia, probki=1000, seed=None, max_stanow=1 << 14):
+    """
+    Statystyki lawinowe dla `probki` losowych wiadomości po `dlugosc_wejscia` bajtów,
+    wpisanych w stan zerowy jak w run_simulation (bez paddingu). Odwracany jest każdy bit
+    wiadomości (najwyżej 25*w bitów). max_stanow - ile odmienionych stanów liczyć w jednej partii.
+    """
+    bits = 25 * w
+    n_wejsc = min(8 * dlugosc_wejscia, bits)
+    if n_wejsc <= 0:
+        raise ValueError("Błąd: wiadomość musi mieć co najmniej 1 bajt")
+    bajty_stanu = -(-bits // 8)
+    ksztalt, na_stany, rundy, na_bajty = _silnik(w, rounds, bajty_stanu)
+    rng = np.random.default_rng(seed)
+
+    #Maska odwrócenia bitu i: bit i w stanie to bajty_stanu z jednym ustawionym bitem
+    i = np.arange(n_wejsc)
+    maski = np.zeros((n_wejsc, bajty_stanu), dtype=np.uint8)
+    maski[i, i // 8] = 1 << (i % 8)
+    odwrocenia = na_stany(maski)                                            #[n_wejsc, *ksztalt]
+
+    suma = np.zeros(rounds + 1, dtype=np.int64)
+    suma_kw = np.zeros(rounds + 1, dtype=np.int64)
+    zmiany = np.zeros((n_wejsc, bits), dtype=np.int64)
+    osie_linii = tuple(range(2, 2 + len(ksztalt)))
+
+    na_partie = max(1, max_stanow // n_wejsc)
+    for start in range(0, probki, na_partie):
+        n = min(na_partie, probki - start)
+        wiadomosci = rng.integers(0, 256, (n, dlugosc_wejscia), dtype=np.uint8)
+        A = na_stany(wiadomosci)                                            #[n, *ksztalt]
+        B = (A[:, None] ^ odwrocenia[None]).reshape((-1,) + ksztalt)        #[n * n_wejsc, *ksztalt]
+
+        def akumuluj(r, A, B):
+            roznica = B.reshape((n, n_wejsc) + ksztalt) ^ A[:, None]
+            d = batched.popcount(roznica).sum(axis=osie_linii, dtype=np.int64)
+            suma[r] += d.sum()
+            suma_kw[r] += (d * d).sum()
+            return roznica
+
+        roznica = akumuluj(0, A, B)
+        for r, (A, B) in enumerate(zip(rundy(A), rundy(B)), start=1):
+            roznica = akumuluj(r, A, B)
+
+        #Macierz SAC: rozpakowane bity różnicy po ostatniej rundzie, zsumowane po wiadomościach
+        bajty = na_bajty(roznica.reshape((-1,) + ksztalt))
+        bity = np.unpackbits(bajty, axis=1, bitorder='little')[:, :bits]
+        zmiany += bity.reshape(n, n_wejsc, bits).sum(axis=0, dtype=np.int64)
+
+    pary = probki * n_wejsc
+    srednia = suma / pary
+    wariancja = np.maximum(suma_kw / pary - srednia ** 2, 0.0)
+    return WynikSAC(srednia, wariancja, zmiany / probki, pary, bits)
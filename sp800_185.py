@@ -0,0 +1,241 @@
+#Funkcje pochodne SHA-3 z NIST SP 800-185: cSHAKE, KMAC i ParallelHash (haszowanie drzewiaste).
+#Dokumentacja: https://nvlpubs.nist.gov/nistpubs/SpecialPublications/NIST.SP.800-185.pdf
+#ParallelHash dzieli wejście na liście po B bajtów; każdy liść ma własną gąbkę, więc liście
+#można liczyć w puli procesów (i wsadowo silnikiem NumPy), a węzeł końcowy łączy ich skróty.
+
+import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from fips202 import _Shake
+from keccak import KeccakLaneSponge
+
+try:
+    import numpy as np
+    import batched
+except ImportError:
+    batched = None  #bez NumPy liście liczone są po kolei na KeccakLaneSponge
+
+SUFIKS_CSHAKE = 0x04    #00 + początek paddingu
+
+
+#Kodowania z rozdziału 2.3
+def left_encode(x):
+    n = max(1, -(-x.bit_length() // 8))
+    return bytes([n]) + x.to_bytes(n, 'big')
+
+
+def right_encode(x):
+    n = max(1, -(-x.bit_length() // 8))
+    return x.to_bytes(n, 'big') + bytes([n])
+
+
+def encode_string(s):
+    return left_encode(len(s) * 8) + bytes(s)
+
+
+def bytepad(x, w):
+    z = left_encode(w) + bytes(x)
+    return z + b'\x00' * (-len(z) % w)
+
+
+class _CShake(_Shake):
+    """cSHAKE: N - nazwa funkcji, S - napis personalizujący. Dla N = S = "" to zwykły SHAKE."""
+    def __init__(self, data=b'', N=b'', S=b''):
+        if N or S:
+            self._sufiks = SUFIKS_CSHAKE
+        super().__init__()
+        if N or S:
+            self.update(bytepad(encode_string(N) + encode_string(S), self.block_size))
+        if data:
+            self.update(data)
+
+
+class cshake128(_CShake):
+    name = 'cshake128'
+    _capacity = 256
+
+
+class cshake256(_CShake):
+    name = 'cshake256'
+    _capacity = 512
+
+
+@lru_cache(maxsize=64)
+def _stan_kmac(cls, key_bytes, S):
+    #Stan po wchłonięciu bytepad(N, S) i bytepad(klucz) - liczony raz na klucz, potem tylko klonowany.
+    #Oba bloki są wyrównane do rate, więc w stanie nie zostaje nic w buforze.
+    h = cls(N=b"KMAC", S=S)
+    h.update(bytepad(encode_string(key_bytes), h.block_size))
+    return h
+
+
+class _KMAC:
+    """
+    KMAC z pamięcią podręczną stanu z kluczem: przy wielu krótkich wiadomościach pod tym samym
+    kluczem wchłanianie klucza (i nazwy/personalizacji) jest robione tylko raz na klucz.
+    """
+    name = None
+    _cshake = None
+
+    def __init__(self, key_bytes, data=b'', S=b''):
+        self._h = _stan_kmac(self._cshake, bytes(key_bytes), bytes(S)).copy()
+        if data:
+            self.update(data)
+
+    @property
+    def block_size(self):
+        return self._h.block_size
+
+    def update(self, data):
+        self._h.update(data)
+
+    def digest(self, length):
+        h = self._h.copy()
+        h.update(right_encode(length * 8))
+        return h.digest(length)
+
+    def hexdigest(self, length):
+        return self.digest(length).hex()
+
+    def copy(self):
+        kopia = object.__new__(type(self))
+        kopia._h = self._h.copy()
+        return kopia
+
+
+class kmac128(_KMAC):
+    name = 'kmac128'
+    _cshake = cshake128
+
+
+class kmac256(_KMAC):
+    name = 'kmac256'
+    _cshake = cshake256
+
+
+def _hash_lisci(liscie, capacity):
+    """
+    Skróty liści (cSHAKE z pustymi N i S, czyli SHAKE) o długości capacity bitów.
+    Liście tej samej długości idą jednym wywołaniem silnika wsadowego.
+    """
+    dlugosc = capacity // 8
+    rate_in_bytes = (1600 - capacity) // 8
+    if batched is None or len(liscie) < 2:
+        wyniki = []
+        for lisc in liscie:
+            g = KeccakLaneSponge(1600 - capacity, capacity, 64, 24, sufiks=0x1F)
+            g.wchlanianie(lisc)
+            wyniki.append(g.wyciskanie(dlugosc))
+        return wyniki
+    wyniki = [None] * len(liscie)
+    grupy = {}
+    for i, lisc in enumerate(liscie):
+        grupy.setdefault(len(lisc), []).append(i)
+    for n, indeksy in grupy.items():
+        dane = np.frombuffer(b''.join(bytes(liscie[i]) for i in indeksy), dtype=np.uint8).reshape(len(indeksy), n)
+        A = batched.absorb(batched.nowe_stany(len(indeksy), 64), batched.pad(dane, rate_in_bytes, 0x1F), 64, 24, rate_in_bytes)
+        for i, skrot in zip(indeksy, batched.squeeze(A, 64, 24, rate_in_bytes, dlugosc)):
+            wyniki[i] = skrot.tobytes()
+    return wyniki
+
+
+class _ParallelHash:
+    """
+    ParallelHash z API strumieniowym: update() zbiera pełne liście i oddaje je do
+    policzenia partiami (w puli procesów, jeśli procesy > 1), digest(length) dokańcza
+    na kopii - można dalej dopisywać dane. Obiekt z pulą procesów warto zamknąć (close()
+    albo with). B - rozmiar liścia w bajtach.
+    """
+    name = None
+    _capacity = 0
+    _cshake = None
+
+    def __init__(self, data=b'', B=8192, S=b'', procesy=None):
+        if B <= 0:
+            raise ValueError("Błąd: rozmiar liścia B musi być dodatni")
+        self.B = B
+        self.S = S
+        self.procesy = procesy or 1
+        self.pula = None
+        self.skroty = []            #skróty liści już policzonych, w kolejności
+        self.liscie = []            #pełne liście czekające na policzenie
+        self.ogon = bytearray()     #niepełny ostatni liść
+        if data:
+            self.update(data)
+
+    def _partia(self):
+        return 64 * self.procesy
+
+    def _policz_liscie(self):
+        if not self.liscie:
+            return
+        if self.procesy > 1:
+            if self.pula is None:
+                self.pula = ProcessPoolExecutor(max_workers=self.procesy)
+            na_proces = -(-len(self.liscie) // self.procesy)
+            grupy = [self.liscie[i:i + na_proces] for i in range(0, len(self.liscie), na_proces)]
+            for wynik in self.pula.map(_hash_lisci, grupy, [self._capacity] * len(grupy)):
+                self.skroty.extend(wynik)
+        else:
+            self.skroty.extend(_hash_lisci(self.liscie, self._capacity))
+        self.liscie = []
+
+    def update(self, data):
+        with memoryview(data) as mv:
+            dane = mv.cast('B')
+            poz = 0
+            if self.ogon:
+                poz = self.B - len(self.ogon)
+                self.ogon += dane[:poz]
+                if len(self.ogon) < self.B:
+                    return
+                self.liscie.append(bytes(self.ogon))
+                self.ogon = bytearray()
+            while poz + self.B <= len(dane):
+                self.liscie.append(bytes(dane[poz:poz + self.B]))
+                poz += self.B
+                if len(self.liscie) >= self._partia():
+                    self._policz_liscie()
+            self.ogon += dane[poz:]
+
+    def digest(self, length):
+        self._policz_liscie()
+        skroty = list(self.skroty)
+        if self.ogon:
+            skroty += _hash_lisci([bytes(self.ogon)], self._capacity)
+        newX = left_encode(self.B) + b''.join(skroty) + right_encode(len(skroty)) + right_encode(length * 8)
+        return self._cshake(newX, N=b"ParallelHash", S=self.S).digest(length)
+
+    def hexdigest(self, length):
+        return self.digest(length).hex()
+
+    def close(self):
+        if self.pula is not None:
+            self.pula.shutdown()
+            self.pula = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class parallel_hash128(_ParallelHash):
+    name = 'parallel_hash128'
+    _capacity = 256
+    _cshake = cshake128
+
+
+class parallel_hash256(_ParallelHash):
+    name = 'parallel_hash256'
+    _capacity = 512
+    _cshake = cshake256
+
+
+def parallel_hash(data_bytes, length, B=8192, S=b'', wariant=128, procesy=None):
+    """Jednorazowe ParallelHash128/256: length bajtów wyniku, procesy=None - wszystkie rdzenie."""
+    cls = parallel_hash128 if wariant == 128 else parallel_hash256
+    with cls(B=B, S=S, procesy=procesy or os.cpu_count()) as h:
+        h.update(data_bytes)
+        return h.digest(length)
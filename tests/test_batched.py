@@ -0,0 +1,27 @@
+#Regresja: szerokości, dla których typ linii jest szerszy niż w (np. w = 24 w uint32, w = 40 w uint64)
+import os
+import numpy as np
+import pytest
+import batched
+from keccak import KeccakSponge
+
+
+@pytest.mark.parametrize("w", [24, 40])
+def test_hash_many_zgodny_z_keccak_sponge(w):
+    rounds = 4
+    bits = 25 * w
+    rate = bits - (512 if bits > 512 else 64)
+    wiadomosci = [b"", b"a", os.urandom(7), os.urandom(rate // 8 + 3)]
+    oczekiwane = []
+    for m in wiadomosci:
+        k = KeccakSponge(rate, bits - rate, w, rounds)
+        k.wchlanianie(m)
+        oczekiwane.append(bytes(k.wyciskanie(12)))
+    assert batched.hash_many(wiadomosci, w, rounds, 12) == oczekiwane
+
+
+@pytest.mark.parametrize("w", [24, 40])
+def test_bajty_na_linie_w_obie_strony(w):
+    dane = os.urandom(25 * w // 8)
+    A = batched.bajty_na_linie(np.frombuffer(dane, dtype=np.uint8).reshape(1, -1), w)
+    assert batched.linie_na_bajty(A, w, len(dane))[0].tobytes() == dane
@@ -0,0 +1,90 @@
+#Rejestrator kroków permutacji: callback dla keccak_f / wykonaj_pojedyncza_runde, który zapisuje
+#każdy stan pośredni jako 25*w bitów (spakowane linie) w jednym, z góry zaalokowanym buforze.
+#Widok bitowy (state[x][y][z]) rozwijany jest dopiero przy odczycie konkretnego wpisu.
+
+from lanes import WidokStanu, stan_na_linie, bajty_na_linie, linie_na_bajty
+
+NAZWY_KROKOW = ("Theta", "Rho", "Pi", "Chi", "Iota")
+
+
+class WpisSladu:
+    __slots__ = ('permutacja', 'runda', 'nazwa', '_dane', '_w')
+
+    def __init__(self, permutacja, runda, nazwa, dane, w):
+        self.permutacja = permutacja
+        self.runda = runda
+        self.nazwa = nazwa
+        self._dane = dane
+        self._w = w
+
+    @property
+    def bajty(self):
+        return self._dane
+
+    @property
+    def linie(self):
+        return bajty_na_linie(self._dane, self._w)
+
+    @property
+    def stan(self):
+        return WidokStanu(self.linie, self._w)
+
+    def __repr__(self):
+        return f"WpisSladu(permutacja={self.permutacja}, runda={self.runda}, nazwa={self.nazwa!r})"
+
+
+class StepTracer:
+    """
+    Użycie: k.keccak_f(callback=tracer) albo k.tracer = tracer (wtedy każda permutacja gąbki
+    jest rejestrowana). kroki - nazwy kroków do zapisu (None = wszystkie), limit - ile ostatnich
+    wpisów trzymać (bufor cykliczny); domyślnie cała permutacja: rounds * liczba kroków.
+    """
+    def __init__(self, w, rounds, kroki=None, limit=None):
+        self.w = w
+        self.rounds = rounds
+        self.kroki = None if kroki is None else frozenset(kroki)
+        nieznane = (self.kroki or frozenset()) - set(NAZWY_KROKOW)
+        if nieznane:
+            raise ValueError(f"Błąd: nieznane kroki {sorted(nieznane)}")
+        self.rozmiar_wpisu = -(-25 * w // 8)
+        self.pojemnosc = limit or rounds * len(self.kroki or NAZWY_KROKOW)
+        self.bufor = bytearray(self.pojemnosc * self.rozmiar_wpisu)
+        self.meta = [None] * self.pojemnosc     #(permutacja, runda, nazwa) dla każdego slotu
+        self.reset()
+
+    def reset(self):
+        self.licznik_krokow = 0     #wszystkie kroki, które przeszły przez callback
+        self.zapisane = 0           #kroki zapisane (po filtrze), także te już nadpisane
+
+    def __call__(self, nazwa_etapu, stan):
+        numer = self.licznik_krokow
+        self.licznik_krokow += 1
+        if self.kroki is not None and nazwa_etapu not in self.kroki:
+            return
+        linie = stan.linie if isinstance(stan, WidokStanu) else stan_na_linie(stan, self.w)
+        slot = self.zapisane % self.pojemnosc
+        R = self.rozmiar_wpisu
+        self.bufor[slot * R:(slot + 1) * R] = linie_na_bajty(linie, self.w, R)
+        self.meta[slot] = (numer // (5 * self.rounds), (numer // 5) % self.rounds, nazwa_etapu)
+        self.zapisane += 1
+
+    def __len__(self):
+        return min(self.zapisane, self.pojemnosc)
+
+    def __bool__(self):
+        #Pusty rejestrator to nadal działający callback (wykonaj_pojedyncza_runde sprawdza "if callback")
+        return True
+
+    def __getitem__(self, i):
+        #Indeks 0 to najstarszy zachowany wpis
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(i)
+        slot = (self.zapisane - n + i % n) % self.pojemnosc
+        R = self.rozmiar_wpisu
+        permutacja, runda, nazwa = self.meta[slot]
+        #Kopia slotu - po zawinięciu bufora wpis nadal pokazuje stan zgodny ze swoją etykietą
+        return WpisSladu(permutacja, runda, nazwa, bytes(self.bufor[slot * R:(slot + 1) * R]), self.w)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))